@@ -0,0 +1,68 @@
+"""
+NumPy 布局后端的差异校验与性能测试
+1. 差异校验：对附件3中的全部订单、每种可用容器和多组随机物品顺序（含合并物品块的情况），比较 layout_items 与 layout_items_np
+   的装箱结果和每件物品的位置、方向，必须完全一致
+2. 性能测试：在不同规模的随机订单上比较两种实现的单次布局耗时
+"""
+import random
+import time
+
+from bench_spatial_index import make_order
+from layout_numpy import layout_items_np
+from order_stream import iter_orders, load_sku_table
+from question_2 import Item, block_merge, expand_blocks, layout_items, load_boxes, preprocess_order
+
+
+def layout_result(layout_fn, items, box):
+    """执行一次布局，返回 (是否成功, 各物品的位置和方向)"""
+    success = layout_fn(items, box)
+    return success, [(i.position, i.orientation) for i in expand_blocks(items)] if success else None
+
+
+def check_orders(rounds=5, seed=0):
+    """在真实订单上逐一比较两种实现的布局结果，返回比较的次数"""
+    rng = random.Random(seed)
+    boxes = load_boxes()
+    orders = iter_orders('附件3-订单信息.xlsx', load_sku_table('附件2-商品尺寸.xlsx'), Item)
+    checked = 0
+    for order_id, items in orders:
+        items, order_boxes = preprocess_order(items, boxes)
+        for _ in range(rounds):
+            rng.shuffle(items)
+            # 分别校验单件物品和合并物品块后的布局
+            for units in (items, block_merge(items)):
+                for box in order_boxes:
+                    expected = layout_result(layout_items, units, box)
+                    actual = layout_result(layout_items_np, units, box)
+                    assert expected == actual, f'订单{order_id}在{box.id}中的布局结果不一致'
+                    checked += 1
+    return checked
+
+
+def time_layout(layout_fn, items, box, repeat):
+    """
+    重复布局 repeat 次，返回平均耗时（毫秒）
+    layout_items 会从 box.checkpoints 恢复上次相同顺序的布局，每次计时前清空检查点，测量完整布局的耗时
+    """
+    total = 0
+    for _ in range(repeat):
+        box.checkpoints = []
+        start = time.perf_counter()
+        layout_fn(items, box)
+        total += time.perf_counter() - start
+    return total / repeat * 1000
+
+
+if __name__ == '__main__':
+    print(f"差异校验通过，共比较 {check_orders()} 次布局")
+
+    rng = random.Random(0)
+    print(f"{'物品数':>6} {'纯Python(ms)':>12} {'NumPy(ms)':>12} {'加速比':>8}")
+    for n in (5, 10, 25, 50, 100, 200):
+        items, box = make_order(n, rng)
+        items.sort(key=lambda x: (-x.volume, -max(x.dims)))
+        assert layout_result(layout_items, items, box) == layout_result(layout_items_np, items, box)
+        repeat = max(1, 400 // n)
+        python_ms = time_layout(layout_items, items, box, repeat)
+        numpy_ms = time_layout(layout_items_np, items, box, repeat)
+        print(f"{n:>6} {python_ms:>12.2f} {numpy_ms:>12.2f} {python_ms / numpy_ms:>8.2f}")
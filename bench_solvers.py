@@ -0,0 +1,153 @@
+"""
+装箱求解器基准测试
+1. 订单集：按附件2的商品分布生成合成订单（可设置物品数、冷冻订单比例、重复商品比例），以及回放附件3的真实订单
+2. 对每个订单集运行全部（或指定的）求解器，统计吞吐量（订单/秒）、P50/P95/P99 单订单耗时、平均利用率、有解订单数和容器选择分布
+3. 结果保存为 JSON；指定 --baseline 时与之前保存的结果逐项比较，利用率下降或耗时明显增加时标记为回退
+
+用法：python bench_solvers.py --sizes 3 6 10 --orders 20 --restarts 2 --output bench.json --baseline old.json
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import time
+from collections import Counter
+
+from order_stream import iter_orders, load_sku_table
+from solvers import SOLVERS, read_boxes, solve
+
+
+def synthetic_orders(sku_table, count, n_items, frozen_ratio=0.3, duplicate_ratio=0.3, seed=0):
+    """
+    按商品尺寸表生成 count 个合成订单，每个订单 n_items 件物品，返回 [(订单序号, 物品列表), ...]
+    frozen_ratio: 冷冻订单的比例（同一订单内的物品温层相同）
+    duplicate_ratio: 物品重复订单中已有商品的概率，越大相同物品越多
+    """
+    rng = random.Random(seed)
+    # 商品尺寸表中有尺寸为 0 的记录（如 6971535016450），不是真实物品，不参与生成
+    valid = [dims for dims in sku_table.values() if min(dims[:3]) > 0]
+    pools = {
+        True: [dims for dims in valid if dims[3]],
+        False: [dims for dims in valid if not dims[3]],
+    }
+    orders = []
+    for order_id in range(1, count + 1):
+        pool = pools[rng.random() < frozen_ratio] or pools[True] or pools[False]
+        items = []
+        for _ in range(n_items):
+            items.append(rng.choice(items) if items and rng.random() < duplicate_ratio else rng.choice(pool))
+        orders.append((order_id, items))
+    return orders
+
+
+def percentile(values, q):
+    """最近秩法百分位数"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * q) - 1)]
+
+
+def run_solver(name, orders, boxes, options):
+    """在一个订单集上运行求解器，返回统计结果字典（先用第一个订单预热一次，排除导入脚本等一次性开销）"""
+    if orders:
+        solve(name, orders[0][1], boxes, **options)
+    times, utilizations, choices = [], [], Counter()
+    for _, items in orders:
+        result, elapsed = solve(name, items, boxes, **options)
+        times.append(elapsed)
+        utilizations.append(result['utilization'])
+        choices[result['box'].strip() if result['box'] else '无解'] += 1
+    total = sum(times)
+    return {
+        'orders': len(orders),
+        'solved': len(orders) - choices.get('无解', 0),
+        'orders_per_sec': len(orders) / total if total else 0,
+        'p50': percentile(times, 0.50),
+        'p95': percentile(times, 0.95),
+        'p99': percentile(times, 0.99),
+        'mean_utilization': sum(utilizations) / len(utilizations) if utilizations else 0,
+        'boxes': dict(sorted(choices.items())),
+    }
+
+
+def compare(baseline, current, utilization_tol=0.5, latency_tol=1.5):
+    """
+    比较两次运行结果，返回回退项列表
+    平均利用率下降超过 utilization_tol 个百分点，或 P95 耗时超过基线的 latency_tol 倍时视为回退
+    """
+    regressions = []
+    for set_name, solvers in current['results'].items():
+        for name, stats in solvers.items():
+            old = baseline.get('results', {}).get(set_name, {}).get(name)
+            if not old:
+                continue
+            if stats['mean_utilization'] < old['mean_utilization'] - utilization_tol:
+                regressions.append(f"{set_name} [{name}] 平均利用率 {old['mean_utilization']:.2f}% -> {stats['mean_utilization']:.2f}%")
+            if stats['solved'] < old['solved']:
+                regressions.append(f"{set_name} [{name}] 有解订单 {old['solved']} -> {stats['solved']}")
+            if old['p95'] and stats['p95'] > old['p95'] * latency_tol:
+                regressions.append(f"{set_name} [{name}] P95 耗时 {old['p95']:.4f}s -> {stats['p95']:.4f}s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='装箱求解器基准测试')
+    parser.add_argument('--solvers', nargs='+', default=sorted(SOLVERS), choices=sorted(SOLVERS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[3, 6, 10], help='合成订单的物品数')
+    parser.add_argument('--orders', type=int, default=20, help='每种规模的合成订单数')
+    parser.add_argument('--frozen-ratio', type=float, default=0.3)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.3)
+    parser.add_argument('--no-replay', action='store_true', help='不回放附件3的真实订单')
+    parser.add_argument('--restarts', type=int, default=2, help='sa 求解器的重启次数')
+    parser.add_argument('--budget', type=float, default=0.5, help='portfolio 求解器每个订单的时间预算（秒）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_solvers.json', help='结果 JSON 文件')
+    parser.add_argument('--baseline', help='用于比较的历史结果 JSON 文件')
+    args = parser.parse_args(argv)
+
+    sku_table = load_sku_table('附件2-商品尺寸.xlsx')
+    boxes = read_boxes('box_inf.txt')
+    order_sets = {}
+    for n in args.sizes:
+        order_sets[f'synthetic-{n}'] = synthetic_orders(sku_table, args.orders, n, args.frozen_ratio,
+                                                        args.duplicate_ratio, seed=args.seed + n)
+    if not args.no_replay:
+        order_sets['附件3'] = list(iter_orders('附件3-订单信息.xlsx', sku_table, lambda l, w, h, is_frozen: (l, w, h, is_frozen)))
+    options = {
+        'sa': {'restarts': args.restarts, 'master_seed': args.seed},
+        'portfolio': {'budget': args.budget, 'master_seed': args.seed},
+    }
+
+    results = {}
+    print(f"{'订单集':>14} {'求解器':>15} {'订单/秒':>9} {'P50(s)':>8} {'P95(s)':>8} {'P99(s)':>8} {'利用率':>7} {'有解':>5}")
+    for set_name, orders in order_sets.items():
+        results[set_name] = {}
+        for name in args.solvers:
+            stats = run_solver(name, orders, boxes, options.get(name, {}))
+            results[set_name][name] = stats
+            print(f"{set_name:>14} {name:>15} {stats['orders_per_sec']:>9.2f} {stats['p50']:>8.4f} {stats['p95']:>8.4f} "
+                  f"{stats['p99']:>8.4f} {stats['mean_utilization']:>6.1f}% {stats['solved']:>5}")
+
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'params': vars(args),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(json.load(f), report)
+        for line in regressions:
+            print('回退:', line)
+        if not regressions:
+            print('与基线相比没有回退')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+空间索引性能测试
+在已放置 n 件物品的容器中执行随机的碰撞查询，对比线性扫描与三维网格索引的耗时，并校验两者的查询结果一致；
+物品尺寸从附件2的商品尺寸中随机抽样
+"""
+import random
+import time
+
+from order_stream import load_sku_table
+from question_2 import Box, Item
+from spatial_index import LinearIndex, SpatialGrid, grid_cell_size
+
+
+def make_order(n, rng):
+    """从商品尺寸表中随机抽取 n 件物品，并构造一个足够大的立方体容器"""
+    rows = [(l, w, h) for l, w, h, _ in load_sku_table('附件2-商品尺寸.xlsx').values()]
+    items = [Item(*rng.choice(rows), False) for _ in range(n)]
+    side = (sum(i.volume for i in items) * 3) ** (1 / 3)
+    side = max(side, max(max(i.dims) for i in items))
+    return items, Box('bench', side, side, side, False)
+
+
+def lattice_placements(items):
+    """把物品按最大边长为间距排成立方点阵，得到一组互不重叠的放置结果"""
+    pitch = max(max(i.dims) for i in items)
+    per_side = int(len(items) ** (1 / 3)) + 1
+    placements = []
+    for k, item in enumerate(items):
+        x, y, z = k % per_side, k // per_side % per_side, k // per_side ** 2
+        placements.append(((x * pitch, y * pitch, z * pitch), item.dims))
+    return placements, pitch * per_side
+
+
+def time_queries(index, queries):
+    """执行全部查询，返回平均每次查询耗时（微秒）和查询结果"""
+    start = time.perf_counter()
+    answers = [index.overlaps(pos, dims) for pos, dims in queries]
+    return (time.perf_counter() - start) / len(queries) * 1e6, answers
+
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    print(f"{'物品数':>6} {'线性扫描(us)':>12} {'网格索引(us)':>12} {'加速比':>8}")
+    for n in (10, 25, 50, 100, 200, 400, 800):
+        items, _ = make_order(n, rng)
+        placements, side = lattice_placements(items)
+        queries = [(tuple(rng.uniform(0, side) for _ in range(3)), rng.choice(items).dims) for _ in range(2000)]
+
+        linear, grid = LinearIndex(), SpatialGrid(grid_cell_size(i.dims for i in items))
+        for pos, dims in placements:
+            linear.insert(pos, dims)
+            grid.insert(pos, dims)
+        linear_us, linear_answers = time_queries(linear, queries)
+        grid_us, grid_answers = time_queries(grid, queries)
+        # 两种索引的查询结果必须完全一致
+        assert linear_answers == grid_answers, f'{n} 件物品的查询结果不一致'
+        print(f"{n:>6} {linear_us:>12.2f} {grid_us:>12.2f} {linear_us / grid_us:>8.2f}")
@@ -0,0 +1,171 @@
+"""
+容器目录
+核心功能：解析包装箱信息（box_inf.txt 文本或附件1 docx 表格说明），校验后编译为 JSON 目录，
+目录中预先计算好体积、排序后的尺寸和冷冻标志；之后各求解器和工作进程直接读取编译结果，不再重新解析源文件。
+源文件的大小或修改时间变化时自动重新编译
+
+用法：python box_catalogue.py "附件1 包装箱尺寸.docx" --output box_catalogue.json --check box_inf.txt
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+
+FORMAT_VERSION = 1
+# 一条容器记录：编号（如 1#纸箱、3#泡沫箱）后跟三个尺寸，编号两侧的引号、空格和逗号都允许缺省
+BOX_PATTERN = re.compile(r'(\d+\s*#\s*(?:纸箱|泡沫箱))\W*?(\d+(?:\.\d+)?)\s*[,，]\s*(\d+(?:\.\d+)?)\s*[,，]\s*(\d+(?:\.\d+)?)')
+_WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def parse_line(line):
+    """解析一行容器记录，返回 (编号, 长, 宽, 高, 是否冷冻专用)，不是容器记录时返回 None；泡沫箱为冷冻专用"""
+    match = BOX_PATTERN.search(line)
+    if not match:
+        return None
+    box_id = re.sub(r'\s+', '', match.group(1))
+    l, w, h = (float(v) for v in match.groups()[1:])
+    return box_id, l, w, h, box_id.endswith('泡沫箱')
+
+
+def parse_text(path):
+    """解析 box_inf.txt 格式的文本，每行一个容器，跳过空行和无法识别的行"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [record for record in map(parse_line, f) if record]
+
+
+def parse_docx(path):
+    """解析附件1 docx：按段落拼接文字后逐段识别容器记录（不依赖 python-docx）"""
+    with zipfile.ZipFile(path) as z:
+        root = ET.fromstring(z.read('word/document.xml'))
+    records = []
+    for paragraph in root.iter(_WORD_NS + 'p'):
+        text = ''.join(node.text or '' for node in paragraph.iter(_WORD_NS + 't'))
+        record = parse_line(text)
+        if record:
+            records.append(record)
+    return records
+
+
+def parse_source(path):
+    """按扩展名选择解析方式"""
+    return parse_docx(path) if path.lower().endswith('.docx') else parse_text(path)
+
+
+def validate(records, source=''):
+    """检查容器记录：至少一个容器、编号不重复、尺寸为正，不满足时抛出 ValueError"""
+    if not records:
+        raise ValueError(f"{source} 中没有识别到容器记录")
+    seen = set()
+    for box_id, l, w, h, _ in records:
+        if box_id in seen:
+            raise ValueError(f"{source} 中容器编号 {box_id} 重复")
+        if min(l, w, h) <= 0:
+            raise ValueError(f"{source} 中容器 {box_id} 的尺寸 {(l, w, h)} 不是正数")
+        seen.add(box_id)
+    return records
+
+
+class BoxCatalogue:
+    """编译后的容器目录，第 k 项对应 ids[k]"""
+    def __init__(self, records):
+        """records: [(编号, 长, 宽, 高, 是否冷冻专用), ...]"""
+        self.ids = [r[0] for r in records]
+        self.dims = [tuple(r[1:4]) for r in records]
+        self.frozen = [bool(r[4]) for r in records]
+        self.volumes = [l * w * h for l, w, h in self.dims]
+        self.sorted_dims = [tuple(sorted(d)) for d in self.dims]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def specs(self):
+        """容器描述列表 [(编号, 长, 宽, 高, 是否冷冻专用), ...]，即 solvers 使用的格式"""
+        return [(box_id, *dims, frozen) for box_id, dims, frozen in zip(self.ids, self.dims, self.frozen)]
+
+    def to_dict(self):
+        return {
+            'version': FORMAT_VERSION,
+            'boxes': [{'id': box_id, 'dims': list(dims), 'sorted_dims': list(s), 'volume': volume, 'frozen': frozen}
+                      for box_id, dims, s, volume, frozen in
+                      zip(self.ids, self.dims, self.sorted_dims, self.volumes, self.frozen)],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从编译结果恢复，直接使用其中预先计算的体积和排序尺寸"""
+        catalogue = cls.__new__(cls)
+        boxes = data['boxes']
+        catalogue.ids = [b['id'] for b in boxes]
+        catalogue.dims = [tuple(b['dims']) for b in boxes]
+        catalogue.frozen = [b['frozen'] for b in boxes]
+        catalogue.volumes = [b['volume'] for b in boxes]
+        catalogue.sorted_dims = [tuple(b['sorted_dims']) for b in boxes]
+        return catalogue
+
+
+def _source_stamp(path):
+    """源文件的 (大小, 修改时间)，用于判断编译结果是否过期"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def compile_catalogue(source, output=None):
+    """解析并校验源文件，把目录写入 output（默认与源文件同名、扩展名为 .catalogue.json），返回 BoxCatalogue"""
+    catalogue = BoxCatalogue(validate(parse_source(source), source))
+    output = output or os.path.splitext(source)[0] + '.catalogue.json'
+    data = catalogue.to_dict()
+    data['source'] = {'path': os.path.basename(source), 'stamp': _source_stamp(source)}
+    # 先在同一目录写各自独立的临时文件再替换，并发启动的进程不会读到写了一半的目录，也不会互相覆盖临时文件
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, output)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return catalogue
+
+
+def load_catalogue(source='box_inf.txt', compiled=None):
+    """
+    读取容器目录：编译结果存在且与源文件一致时直接读取，否则重新编译
+    compiled: 编译结果路径，默认与源文件同名、扩展名为 .catalogue.json
+    """
+    compiled = compiled or os.path.splitext(source)[0] + '.catalogue.json'
+    try:
+        with open(compiled, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == FORMAT_VERSION and data['source']['stamp'] == _source_stamp(source):
+            return BoxCatalogue.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        pass  # 没有编译结果、内容损坏或格式过期时重新编译
+    try:
+        return compile_catalogue(source, compiled)
+    except OSError:
+        # 目录不可写时只在内存中使用解析结果
+        return BoxCatalogue(validate(parse_source(source), source))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='编译容器目录')
+    parser.add_argument('source', nargs='?', default='box_inf.txt', help='包装箱信息文件（txt / docx）')
+    parser.add_argument('--output', help='编译结果 JSON 文件')
+    parser.add_argument('--check', help='与另一个源文件比较，内容不一致时报错')
+    args = parser.parse_args(argv)
+
+    catalogue = compile_catalogue(args.source, args.output)
+    for box_id, l, w, h, frozen in catalogue.specs():
+        print(f"{box_id}: {l} x {w} x {h}, {'冷冻专用' if frozen else '常温'}")
+    if args.check:
+        other = BoxCatalogue(validate(parse_source(args.check), args.check))
+        if sorted(other.specs()) != sorted(catalogue.specs()):
+            raise SystemExit(f"{args.source} 与 {args.check} 的容器信息不一致")
+        print(f"与 {args.check} 一致")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+容器可行性预筛选
+核心功能：在尝试任何布局之前，用尺寸支配关系和三维装箱下界排除不可能装下订单的容器，
+只把可能可行的容器按体积从小到大交给装箱算法
+"""
+import math
+
+
+def _volume(dims):
+    return dims[0] * dims[1] * dims[2]
+
+
+def lower_bound_bins(item_dims, box_dims):
+    """
+    装下全部物品至少需要多少个 box_dims 尺寸的容器（允许物品任意旋转）
+    L0：总体积下界
+    L2：两件物品能放进同一容器，必须在某个方向上并排，即两者最短边之和不超过容器最长边 b3。
+        对阈值 p，最短边大于 b3-p 的物品（J1）不能与最短边不小于 p 的物品同箱，
+        最短边在 (b3/2, b3-p] 的物品（J2）两两不能同箱，最短边在 [p, b3/2] 的物品（J3）
+        只能放进 J2 物品所在容器的剩余体积或新的容器
+    """
+    if not item_dims:
+        return 0
+    box_volume = _volume(box_dims)
+    total_volume = sum(_volume(d) for d in item_dims)
+    bound = math.ceil(total_volume / box_volume - 1e-9)  # L0
+
+    longest = max(box_dims)
+    shortest_sides = sorted(((min(d), _volume(d)) for d in item_dims), reverse=True)
+    thresholds = {s for s, _ in shortest_sides if s <= longest / 2} | {longest / 2}
+    for p in thresholds:
+        j1 = [v for s, v in shortest_sides if s > longest - p]
+        j2 = [v for s, v in shortest_sides if longest / 2 < s <= longest - p]
+        j3_volume = sum(v for s, v in shortest_sides if p <= s <= longest / 2)
+        spare = sum(box_volume - v for v in j2)
+        extra = max(0, math.ceil((j3_volume - spare) / box_volume - 1e-9))
+        bound = max(bound, len(j1) + len(j2) + extra)
+    return bound
+
+
+def fits_box(item_dims, box_dims):
+    """单件物品能否放进容器：排序后的三边逐一不大于容器排序后的三边"""
+    box_sorted = sorted(box_dims)
+    return all(all(d <= b for d, b in zip(sorted(dims), box_sorted)) for dims in item_dims)
+
+
+def screen_boxes(item_dims, boxes, get_dims=lambda b: b.dims):
+    """
+    返回可能装下全部物品的容器，按体积从小到大排序，列表第一个即为可能可行的最小容器
+    item_dims: 各物品的尺寸 (长, 宽, 高)
+    get_dims: 从容器对象取尺寸的函数，默认读取 box.dims
+    """
+    item_dims = list(item_dims)
+    feasible = [b for b in boxes
+                if fits_box(item_dims, get_dims(b)) and lower_bound_bins(item_dims, get_dims(b)) <= 1]
+    return sorted(feasible, key=lambda b: _volume(get_dims(b)))
@@ -0,0 +1,32 @@
+"""
+布局能量模型
+核心功能：能量 = 体积利用率 * 体积权重 + X/Y/Z 三向最大延伸占比之积 * 紧凑度权重。
+体积项对固定的订单和容器是常数，创建模型时计算一次；三向最大延伸随放置记录逐件入栈、按放置数量回退，
+配合增量布局使用时每次查询能量只需 O(1)
+"""
+
+
+class EnergyModel:
+    """单个容器上的能量模型，extents[k] 为前 k 条放置记录的三向最大延伸"""
+    def __init__(self, box, items, volume_weight=0.7, fill_weight=0.3):
+        self.box = box
+        self.used_volume = sum(i.volume for i in items)  # 已使用体积，与物品顺序无关
+        self.volume_term = (self.used_volume / box.volume) * volume_weight
+        self.fill_weight = fill_weight
+        self.extents = [(0, 0, 0)]
+
+    def push(self, pos, dims):
+        """加入一条放置记录，更新三向最大延伸"""
+        x, y, z = self.extents[-1]
+        self.extents.append((max(x, pos[0] + dims[0]), max(y, pos[1] + dims[1]), max(z, pos[2] + dims[2])))
+
+    def rollback(self, count):
+        """回退到只保留前 count 条放置记录的状态"""
+        del self.extents[count + 1:]
+
+    def energy(self):
+        """当前放置状态的能量值"""
+        max_coord_x, max_coord_y, max_coord_z = self.extents[-1]
+        dims = self.box.dims
+        dim_fill_rate = max_coord_x / dims[0] * max_coord_y / dims[1] * max_coord_z / dims[2]
+        return self.volume_term + dim_fill_rate * self.fill_weight
@@ -0,0 +1,132 @@
+"""
+基于 NumPy 的布局计算后端
+核心功能：空闲空间保存在连续的 NumPy 数组中，一次向量化运算完成全部 空间 × 方向 组合的尺寸匹配、
+相交空间的切分和包含关系判断；空间排序、方向排序、切分和合并规则与 layout_items 完全一致，放置结果相同
+"""
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def orientation_table(orientations):
+    """物品摆放方向表 item.orientations 对应的 (k, 3) 数组"""
+    return np.array(orientations, dtype=float)
+
+
+def _overlap_rows(region_pos, region_dims, pos, dims):
+    """各空闲空间是否与放置的物品相交，判定规则与 check_overlap 相同"""
+    mask = np.ones(len(region_pos), dtype=bool)
+    for axis in range(3):
+        x1, w1 = region_pos[:, axis], region_dims[:, axis]
+        x2, w2 = pos[axis], dims[axis]
+        mask &= np.where(x1 <= x2, x2 < x1 + w1, x1 < x2 + w2)
+    return mask
+
+
+def _split_space(region_pos, region_dims, pos, dims, min_volume, min_side):
+    """split_space 的向量化实现，返回 (未受影响的空间, 切分出的新空间)，各自为 (pos, dims) 数组"""
+    hit = _overlap_rows(region_pos, region_dims, pos, dims)
+    hit_pos, hit_dims = region_pos[hit], region_dims[hit]
+    end = pos + dims
+    hit_end = hit_pos + hit_dims
+
+    # 每个相交空间依次切出 X负、X正、Y负、Y正、Z负、Z正 6 个子空间，与 split_space 的生成顺序一致
+    piece_pos = np.repeat(hit_pos[:, None, :], 6, axis=1)
+    piece_dims = np.repeat(hit_dims[:, None, :], 6, axis=1)
+    valid = np.empty((len(hit_pos), 6), dtype=bool)
+    for axis in range(3):
+        low, high = 2 * axis, 2 * axis + 1
+        piece_dims[:, low, axis] = pos[axis] - hit_pos[:, axis]
+        valid[:, low] = pos[axis] > hit_pos[:, axis]
+        piece_pos[:, high, axis] = end[axis]
+        piece_dims[:, high, axis] = hit_end[:, axis] - end[axis]
+        valid[:, high] = hit_end[:, axis] > end[axis]
+
+    piece_pos, piece_dims = piece_pos[valid], piece_dims[valid]
+    keep = (piece_dims[:, 0] * piece_dims[:, 1] * piece_dims[:, 2] >= min_volume) & (piece_dims.min(axis=1) >= min_side)
+    return (region_pos[~hit], region_dims[~hit]), (piece_pos[keep], piece_dims[keep])
+
+
+def _merge_space(region_pos, region_dims, new_pos, new_dims, eps=1e-9):
+    """merge_space 的向量化实现：逐个加入新空间，只在新空间之间删除被包含的空间（未受影响的空间不会被新空间包含）"""
+    region_end = region_pos + region_dims
+    accepted_pos, accepted_dims = np.empty((0, 3)), np.empty((0, 3))
+    for p, d in zip(new_pos, new_dims):
+        accepted_end = accepted_pos + accepted_dims
+        # 新空间被已接受的新空间或未受影响的空间包含时丢弃
+        if np.any((p >= accepted_pos - eps).all(axis=1) & (p + d <= accepted_end + eps).all(axis=1)):
+            continue
+        if np.any((p >= region_pos - eps).all(axis=1) & (p + d <= region_end + eps).all(axis=1)):
+            continue
+        # 删除被新空间包含的已接受新空间
+        contained = (accepted_pos >= p - eps).all(axis=1) & (accepted_end <= p + d + eps).all(axis=1)
+        accepted_pos = np.vstack((accepted_pos[~contained], p))
+        accepted_dims = np.vstack((accepted_dims[~contained], d))
+    return np.vstack((region_pos, accepted_pos)), np.vstack((region_dims, accepted_dims))
+
+
+def layout_items_np(items, box, energy=None, stats=None):
+    """layout_items 的向量化实现，参数、返回值和对 items / box 的修改方式与 layout_items 相同（不使用布局检查点）"""
+    if not box:
+        return
+    box.used_space = []  # 重置容器装载状态
+    if energy:
+        energy.rollback(0)
+    if stats:
+        stats.count('layouts')
+    if not items:
+        return True
+
+    region_pos = np.zeros((1, 3))
+    region_dims = np.array([box.dims], dtype=float)
+    singles = [m for i in items for m in getattr(i, 'members', (i,))]
+    min_volume = min(m.volume for m in singles)
+    min_side = min(min(m.dims) for m in singles)
+    pending = list(reversed(items))  # 待放置物品栈，物品块拆开后成员物品压回栈顶
+
+    while pending:
+        item = pending.pop()
+        # 按空间体积升序、最大边降序稳定排序，与 layout_items 中 list.sort 的结果一致
+        volume = region_dims[:, 0] * region_dims[:, 1] * region_dims[:, 2]
+        order = np.lexsort((-region_dims.max(axis=1), volume))
+        region_pos = region_pos[order]
+        region_dims = region_dims[order]
+
+        orientations = item.orientations
+        orientation_array = orientation_table(orientations)
+        # 所有 空间 × 方向 组合的尺寸匹配矩阵，按行优先展开后与逐个尝试的顺序一致
+        fit = (orientation_array[None, :, :] <= region_dims[:, None, :]).all(axis=2).ravel()
+        candidates = np.flatnonzero(fit)
+        if stats:
+            stats.count('placements_tried')
+            stats.peak('max_free_regions', len(region_pos))
+        if not len(candidates):
+            members = getattr(item, 'members', None)
+            if members:
+                if stats:
+                    stats.count('block_splits')
+                pending.extend(reversed(members))  # 物品块放不下，拆成单件逐个放置
+                continue
+            box.used_space = []  # 重置容器装载状态
+            if stats:
+                stats.count('layout_failures')
+            return False  # 放置失败终止装箱
+
+        i, o = divmod(int(candidates[0]), len(orientations))
+        dim = orientations[o]
+        new_pos = tuple(region_pos[i].tolist())
+        item.position = new_pos
+        item.orientation = dim
+        if hasattr(item, 'members'):
+            item.place_members()
+        box.used_space.append((new_pos, dim, item))
+        if energy:
+            energy.push(new_pos, dim)
+
+        # 按新放置的物品切分空闲空间，并删除被包含的空间
+        (region_pos, region_dims), (piece_pos, piece_dims) = _split_space(
+            region_pos, region_dims, region_pos[i].copy(), orientation_array[o], min_volume, min_side)
+        region_pos, region_dims = _merge_space(region_pos, region_dims, piece_pos, piece_dims)
+
+    return True  # 所有物品成功放置
@@ -0,0 +1,74 @@
+"""
+订单流式读取
+核心功能：逐行读取商品尺寸表和订单文件（xlsx 使用 openpyxl 只读模式，csv 使用标准库），
+每次只组装出一个完整订单交给装箱算法，内存占用与订单文件的行数无关
+"""
+import csv
+
+import openpyxl
+
+
+def iter_rows(path):
+    """逐行读取 xlsx / csv 文件的第一张表，以 {列名: 值} 的形式返回每一行"""
+    if str(path).lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)
+        return
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        for row in rows:
+            if any(value is not None for value in row):
+                yield dict(zip(header, row))
+    finally:
+        workbook.close()
+
+
+def load_sku_table(path):
+    """读取商品尺寸表，返回 {Item_Code: (长, 宽, 高, 是否冷冻)}（同一编码出现多次时保留第一条）"""
+    sku_table = {}
+    for row in iter_rows(path):
+        code = str(row['Item_Code']).strip()
+        if code not in sku_table:
+            sku_table[code] = (float(row['L']), float(row['W']), float(row['H']), row['TL'] != '常温')
+    return sku_table
+
+
+def iter_orders(path, sku_table, make_item, catalogue=None):
+    """
+    逐个产出订单 (订单序号, 物品列表)
+    订单文件中同一订单的各行需要相邻（附件3即按订单序号排列），不相邻的记录会被当作另一个订单（订单序号相同，各段分别产出）；make_item(l, w, h, is_frozen) 用于创建物品对象
+    catalogue: 由同一商品尺寸表生成的 SkuCatalogue，给定时以 make_item(l, w, h, is_frozen, 行号, 方向表) 创建物品
+    """
+    order_id, quantities = None, {}
+    for row in iter_rows(path):
+        row_order = int(row['订单序号'])
+        if row_order != order_id:
+            if order_id is not None:
+                yield order_id, _assemble(order_id, quantities, sku_table, make_item, catalogue)
+            order_id, quantities = row_order, {}
+        code = str(row['Item_Code']).strip()
+        quantities[code] = quantities.get(code, 0) + int(row['Num'])
+    if order_id is not None:
+        yield order_id, _assemble(order_id, quantities, sku_table, make_item, catalogue)
+
+
+def _assemble(order_id, quantities, sku_table, make_item, catalogue=None):
+    """按商品数量创建订单的物品列表"""
+    items = []
+    for code, num in quantities.items():
+        if code not in sku_table:
+            print(f"订单{order_id}物品{code}在商品尺寸表中不存在，已跳过")
+            continue
+        l, w, h, is_frozen = sku_table[code]
+        if catalogue is None:
+            items.extend(make_item(l, w, h, is_frozen) for _ in range(num))
+        else:
+            sku = catalogue.index[code]
+            orientations = catalogue.orientation_tuples[sku]
+            items.extend(make_item(l, w, h, is_frozen, sku, orientations) for _ in range(num))
+    return items
@@ -0,0 +1,115 @@
+"""
+装箱结果缓存
+核心功能：以订单的规范签名（物品尺寸、冷冻标志、数量的有序列表 + 容器目录的哈希）为键缓存装箱方案，
+内存中保留最近使用的 LRU 一级缓存，磁盘上用 SQLite 作为二级缓存并按条数上限淘汰最久未使用的记录，
+相同商品组合的订单在多次批量运行之间只需查一次表，不必重新退火
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+
+
+def catalogue_hash(boxes):
+    """容器目录的哈希值：容器编号、尺寸或冷冻标志变化时缓存自动失效"""
+    catalogue = sorted((b.id, tuple(b.dims), b.is_used_for_frozen) for b in boxes)
+    return hashlib.sha1(repr(catalogue).encode('utf-8')).hexdigest()
+
+
+def order_signature(items, boxes):
+    """订单的规范签名：与物品顺序和摆放方向无关，只取决于各尺寸物品的数量和可用容器"""
+    counts = {}
+    for item in items:
+        key = (tuple(sorted(item.dims)), item.is_frozen)
+        counts[key] = counts.get(key, 0) + 1
+    signature = sorted((dims, is_frozen, count) for (dims, is_frozen), count in counts.items())
+    return hashlib.sha1(repr((signature, catalogue_hash(boxes))).encode('utf-8')).hexdigest()
+
+
+def encode_result(result):
+    """把装箱结果 (容器, 放置顺序, 使用体积, 利用率) 转换为可存储的字典"""
+    best_box, best_order, used_volume, utilization = result
+    if not best_box:
+        return {'box': None, 'placements': [], 'used_volume': 0, 'utilization': 0}
+    placements = [[sorted(i.dims), list(i.position), list(i.orientation)] for i in best_order]
+    return {'box': best_box.id, 'placements': placements, 'used_volume': used_volume, 'utilization': utilization}
+
+
+def decode_result(entry, items, boxes):
+    """把缓存的方案套用到当前订单的物品上，返回与装箱函数相同格式的结果"""
+    if entry['box'] is None:
+        return None, None, 0, 0
+    best_box = next(b for b in boxes if b.id == entry['box'])
+    # 按尺寸分组，把缓存中的位置和方向依次分配给尺寸相同的物品
+    pool = {}
+    for item in items:
+        pool.setdefault(tuple(sorted(item.dims)), []).append(item)
+    best_order = []
+    for dims, position, orientation in entry['placements']:
+        item = pool[tuple(dims)].pop()
+        item.position = tuple(position)
+        item.orientation = tuple(orientation)
+        best_order.append(item)
+    return best_box, best_order, entry['used_volume'], entry['utilization']
+
+
+class PackCache:
+    """两级装箱结果缓存：内存 LRU + SQLite 磁盘存储（path 为 None 时只使用内存）"""
+    def __init__(self, path=None, memory_size=1024, disk_size=100000):
+        self.memory = OrderedDict()      # 签名 -> 缓存的方案
+        self.memory_size = memory_size   # 内存中最多保留的条数
+        self.disk_size = disk_size       # 磁盘上最多保留的条数
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path)
+            self.db.execute('CREATE TABLE IF NOT EXISTS pack_cache '
+                            '(signature TEXT PRIMARY KEY, entry TEXT NOT NULL, last_used REAL NOT NULL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS pack_cache_last_used ON pack_cache (last_used)')
+
+    def get(self, signature):
+        """查找缓存，命中时返回方案字典，否则返回 None"""
+        if signature in self.memory:
+            self.memory.move_to_end(signature)
+            self.hits += 1
+            return self.memory[signature]
+        if self.db:
+            row = self.db.execute('SELECT entry FROM pack_cache WHERE signature = ?', (signature,)).fetchone()
+            if row:
+                self.db.execute('UPDATE pack_cache SET last_used = ? WHERE signature = ?', (time.time(), signature))
+                entry = json.loads(row[0])
+                self._remember(signature, entry)
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def put(self, signature, entry):
+        """写入缓存，超过容量时淘汰最久未使用的记录"""
+        self._remember(signature, entry)
+        if self.db:
+            self.db.execute('INSERT OR REPLACE INTO pack_cache VALUES (?, ?, ?)',
+                            (signature, json.dumps(entry), time.time()))
+            count = self.db.execute('SELECT COUNT(*) FROM pack_cache').fetchone()[0]
+            if count > self.disk_size:
+                # 一次淘汰约 10% 的记录，避免每次写入都触发淘汰
+                evict = count - self.disk_size + self.disk_size // 10
+                self.db.execute('DELETE FROM pack_cache WHERE signature IN '
+                                '(SELECT signature FROM pack_cache ORDER BY last_used LIMIT ?)', (evict,))
+            self.db.commit()
+
+    def _remember(self, signature, entry):
+        """写入内存 LRU 缓存"""
+        self.memory[signature] = entry
+        self.memory.move_to_end(signature)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def close(self):
+        """提交并关闭磁盘缓存"""
+        if self.db:
+            self.db.commit()
+            self.db.close()
+            self.db = None
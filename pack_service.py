@@ -0,0 +1,216 @@
+"""
+常驻装箱服务
+核心功能：启动时只读取一次商品尺寸表和容器目录，进程池常驻并预先导入装箱脚本；
+客户端通过 TCP（或 Unix socket）逐行发送 JSON 订单，服务把短时间窗口内到达的订单合并成一批交给 pack_orders 并行装箱，
+每个订单返回一行 JSON：所选容器、各物品的位置和方向（装不进单个容器时为多箱）
+
+请求：{"id": "A001", "items": [{"code": "6925723000431", "num": 2}, ...]}
+响应：{"id": "A001", "boxes": [{"box": "2#纸箱", "utilization": 59.8, "used_volume": ..., "placements": [[原始尺寸], [位置], [方向]], ...}],
+      "unpacked": [放不进任何容器的物品尺寸], "unknown": [商品尺寸表中不存在的编号], "ms": 耗时毫秒}
+格式错误或装箱失败的请求返回 {"id": ..., "error": "..."}；同一连接上的多个请求并发处理，响应按完成顺序返回
+
+用法：python pack_service.py --port 8765 --workers 4 --restarts 3
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from order_stream import load_sku_table
+from pack_cache import PackCache, encode_result
+from question_2 import BoxPools, Item, load_boxes, pack_orders
+from sku_catalogue import SkuCatalogue
+
+
+class PackService:
+    """装箱服务的常驻状态：商品目录、容器池、进程池、结果缓存和待处理订单队列"""
+    def __init__(self, sku_path='附件2-商品尺寸.xlsx', box_path='box_inf.txt', restarts=3, workers=None,
+                 batch_size=32, batch_window=0.005, split_budget=2.0, cache_path=None, master_seed=0):
+        """
+        batch_size: 一批最多合并的订单数；batch_window: 收到第一个订单后等待更多订单的时间（秒）
+        workers: 退火进程数，默认使用全部 CPU 核心，为 1 时在服务进程内顺序退火
+        cache_path: PackCache 磁盘缓存路径，为 None 时只使用内存缓存
+        """
+        self.sku_table = load_sku_table(sku_path)
+        self.catalogue = SkuCatalogue(self.sku_table)
+        self.pools = BoxPools(load_boxes(box_path))
+        self.restarts = restarts
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.split_budget = split_budget
+        self.cache_path = cache_path
+        self.master_seed = master_seed
+        self.order_ids = itertools.count()
+        self.queue = None
+        self.cache = None
+        self.executor = None
+        # 装箱在单独的线程中按批顺序执行，不阻塞事件循环；缓存的 SQLite 连接只在这个线程中使用
+        self.thread = ThreadPoolExecutor(max_workers=1)
+
+    async def start(self):
+        """启动进程池（工作进程预先导入 question_2）、创建缓存并开始合并订单"""
+        loop = asyncio.get_running_loop()
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=importlib.import_module,
+                                                initargs=('question_2',))
+            # 提交空任务让全部工作进程立即启动，第一个订单不必等待进程创建
+            await asyncio.gather(*(loop.run_in_executor(self.executor, int) for _ in range(self.workers)))
+        self.cache = await loop.run_in_executor(self.thread, PackCache, self.cache_path)
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self._batch_loop())
+
+    async def close(self):
+        """停止合并订单，关闭缓存、线程和进程池"""
+        self.batcher.cancel()
+        await asyncio.get_running_loop().run_in_executor(self.thread, self.cache.close)
+        self.thread.shutdown()
+        if self.executor:
+            self.executor.shutdown()
+
+    def make_items(self, request):
+        """按请求中的商品编号和数量创建物品，返回 (物品列表, 不存在的商品编号)"""
+        items, unknown = [], []
+        for entry in request['items']:
+            code = str(entry['code']).strip()
+            if code not in self.catalogue.index:
+                unknown.append(code)
+                continue
+            sku = self.catalogue.index[code]
+            l, w, h, is_frozen = self.sku_table[code]
+            orientations = self.catalogue.orientation_tuples[sku]
+            items.extend(Item(l, w, h, is_frozen, sku, orientations) for _ in range(int(entry.get('num', 1))))
+        return items, unknown
+
+    async def pack(self, items):
+        """提交一个订单，等待所在批次完成后返回各箱结果列表"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((items, future))
+        return await future
+
+    async def _batch_loop(self):
+        """取出第一个订单后在 batch_window 内继续收集，凑满 batch_size 或超时后整批装箱"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            orders = {next(self.order_ids): entry for entry in batch}
+            try:
+                results = await loop.run_in_executor(self.thread, self._pack_batch,
+                                                     {order_id: items for order_id, (items, _) in orders.items()})
+            except Exception as e:
+                for _, future in orders.values():
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for order_id, (_, future) in orders.items():
+                if not future.done():
+                    future.set_result(results[order_id])
+
+    def _pack_batch(self, orders):
+        """在装箱线程中执行：整批调用 pack_orders，把各箱结果转换为可写入 JSON 的字典"""
+        results = {}
+        for order_id, bins in pack_orders(orders, self.pools, self.restarts, self.workers, self.master_seed,
+                                          self.cache, self.split_budget, self.executor):
+            boxes, unpacked = [], []
+            for bin_result in bins:
+                if bin_result[0]:
+                    boxes.append(encode_result(bin_result))
+                else:
+                    unpacked.extend(sorted(i.dims) for i in bin_result[1])
+            results[order_id] = (boxes, unpacked)
+        return results
+
+    async def handle_request(self, request):
+        """处理一个请求，返回响应字典"""
+        start = time.perf_counter()
+        try:
+            items, unknown = self.make_items(request)
+        except (KeyError, TypeError, ValueError) as e:
+            return {'id': request.get('id'), 'error': f'请求格式错误: {e!r}'}
+        try:
+            boxes, unpacked = await self.pack(items) if items else ([], [])
+        except Exception as e:
+            # 所在批次装箱失败：该批的每个请求都返回错误，不让客户端一直等待
+            return {'id': request.get('id'), 'error': f'装箱失败: {e!r}'}
+        return {'id': request.get('id'), 'boxes': boxes, 'unpacked': unpacked, 'unknown': unknown,
+                'ms': round((time.perf_counter() - start) * 1000, 3)}
+
+    async def handle_connection(self, reader, writer):
+        """逐行读取请求，每个请求一个任务并发处理，完成后立即写回响应"""
+        async def respond(line):
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('请求应为 JSON 对象')
+            except ValueError as e:
+                response = {'id': None, 'error': f'请求格式错误: {e}'}
+            else:
+                response = await self.handle_request(request)
+            writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            await writer.drain()
+
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+
+async def serve(service, host='127.0.0.1', port=8765, unix_path=None):
+    """启动服务并一直运行"""
+    await service.start()
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_connection, unix_path)
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"装箱服务已启动: {unix_path or f'{host}:{port}'}, 进程数 {service.workers}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='常驻装箱服务（JSON Lines over TCP / Unix socket）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='Unix socket 路径，指定时不监听 TCP 端口')
+    parser.add_argument('--skus', default='附件2-商品尺寸.xlsx', help='商品尺寸文件（xlsx / csv）')
+    parser.add_argument('--boxes', default='box_inf.txt', help='包装箱信息文件（txt / docx）')
+    parser.add_argument('--workers', type=int, help='退火进程数，默认使用全部 CPU 核心')
+    parser.add_argument('--restarts', type=int, default=3, help='每个订单的退火重启次数')
+    parser.add_argument('--batch-size', type=int, default=32, help='一批最多合并的订单数')
+    parser.add_argument('--batch-window', type=float, default=0.005, help='合并订单的等待时间（秒）')
+    parser.add_argument('--split-budget', type=float, default=2.0, help='拆分到多箱的时间预算（秒）')
+    parser.add_argument('--cache', help='PackCache 磁盘缓存文件')
+    args = parser.parse_args(argv)
+
+    service = PackService(args.skus, args.boxes, args.restarts, args.workers, args.batch_size,
+                          args.batch_window, args.split_budget, args.cache)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
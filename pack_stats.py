@@ -0,0 +1,63 @@
+"""
+装箱过程统计
+核心功能：为 layout_items、greedy_pack 和 simulated_annealing_pack 提供可选的计数器、计时器和退火轨迹记录；
+装箱函数的 stats 参数默认为 None，此时只多一次 if 判断，几乎没有额外开销；
+每个订单使用一个 PackStats，结束后用 to_dict() 导出为可写入 JSON 的字典
+"""
+import time
+from contextlib import contextmanager
+
+
+class PackStats:
+    """一个订单的装箱统计：计数器、累计耗时和退火每一步的 (温度, 当前能量, 最佳能量, 是否接受)"""
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+        self.trace = []
+
+    def count(self, name, n=1):
+        """计数器 name 增加 n"""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def peak(self, name, value):
+        """记录 name 的最大值"""
+        if value > self.counters.get(name, 0):
+            self.counters[name] = value
+
+    def add_time(self, name, seconds):
+        """计时器 name 累加 seconds 秒"""
+        self.timers[name] = self.timers.get(name, 0) + seconds
+
+    @contextmanager
+    def timer(self, name):
+        """用 with stats.timer(name): 统计代码块的累计耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def record(self, temperature, energy, best_energy, accepted):
+        """记录退火的一步"""
+        self.trace.append((temperature, energy, best_energy, accepted))
+
+    def acceptance_profile(self, window=50):
+        """把退火轨迹按每 window 步分段，返回各段的 (起始温度, 平均能量, 最佳能量, 接受率)"""
+        profile = []
+        for start in range(0, len(self.trace), window):
+            steps = self.trace[start:start + window]
+            profile.append({
+                'temperature': steps[0][0],
+                'energy': sum(s[1] for s in steps) / len(steps),
+                'best_energy': steps[-1][2],
+                'acceptance_rate': sum(s[3] for s in steps) / len(steps),
+            })
+        return profile
+
+    def to_dict(self, window=50):
+        """导出为字典：计数器、计时器（秒）和分段后的退火轨迹"""
+        return {
+            'counters': dict(self.counters),
+            'timers': {name: round(seconds, 6) for name, seconds in self.timers.items()},
+            'annealing': self.acceptance_profile(window),
+        }
@@ -0,0 +1,55 @@
+"""
+多进程并行装箱
+核心功能：把 (订单, 退火重启) 拆成相互独立的任务分发到进程池，每个任务使用由主种子派生的确定性种子创建独立的随机数生成器，
+最后按订单归约出利用率最高的结果
+"""
+import copy
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+
+def derive_seed(master_seed, order_id, restart):
+    """由主种子、订单号和重启序号派生出确定性的任务种子"""
+    return random.Random(f'{master_seed}-{order_id}-{restart}').getrandbits(64)
+
+
+def _run_job(job):
+    """进程池中执行的单个任务：用任务种子创建随机数生成器后调用装箱函数"""
+    order_id, restart, seed, pack_fn, items, boxes = job
+    return order_id, restart, pack_fn(items, boxes, rng=random.Random(seed))
+
+
+def parallel_pack(orders, pack_fn, restarts=10, workers=None, master_seed=0, executor=None):
+    """
+    并行执行多个订单的多次退火，返回 {订单号: (容器, 放置顺序, 使用体积, 利用率)}
+    orders: {订单号: (物品列表, 容器列表)}，物品和容器应已经过 preprocess_order 处理
+    pack_fn: 装箱函数，签名为 pack_fn(items, boxes, rng)，rng 为该任务专用的 random.Random，返回值第 4 项为利用率
+    workers: 进程数，默认使用全部 CPU 核心；为 1 时在当前进程内顺序执行
+    executor: 已经启动的进程池，给定时直接复用（常驻服务保持进程池常驻，不必每批重新创建进程），workers 只用于计算任务分块
+    """
+    jobs = [(order_id, restart, derive_seed(master_seed, order_id, restart), pack_fn, items, boxes)
+            for order_id, (items, boxes) in orders.items()
+            for restart in range(restarts)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if executor is None and (workers == 1 or len(jobs) <= 1):
+        # 进程内顺序执行时复制物品和容器，避免各次重启共享并改写同一批对象的放置状态
+        return _reduce_best(_run_job(job[:4] + copy.deepcopy(job[4:])) for job in jobs)
+
+    # 每个进程一次领取若干任务，减少进程间通信次数
+    chunksize = max(1, len(jobs) // (workers * 4))
+    if executor is not None:
+        return _reduce_best(executor.map(_run_job, jobs, chunksize=chunksize))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return _reduce_best(executor.map(_run_job, jobs, chunksize=chunksize))
+
+
+def _reduce_best(outputs):
+    """按订单保留利用率最高的结果，利用率相同时取重启序号较小者，保证结果可复现"""
+    best = {}
+    for order_id, restart, result in outputs:
+        if order_id not in best or result[3] > best[order_id][1][3]:
+            best[order_id] = (restart, result)
+    return {order_id: result for order_id, (_, result) in best.items()}
@@ -1,15 +1,17 @@
 import pandas as pd
 import numpy as np
+import heapq
 import itertools
+from box_catalogue import load_catalogue
+from box_screen import screen_boxes
+from spatial_index import SpatialGrid, grid_cell_size
 
-data = pd.read_excel('附件2-商品尺寸.xlsx')
-common_item = data[data['TL']=='常温']
-cold_item = data[data['TL']=='冷冻']
 
 
 
 class Item:
     # 定义一个名为 Box 的类，用于表示一个长方体盒子
+    __slots__ = ('l', 'w', 'h', 'is_frozen', 'volume', 'orientations', 'positions', 'is_placed')
 
     def __init__(self, l, w, h ,is_frozen,is_placed=False,orientations=None):
         # 定义类的构造函数，初始化盒子对象的属性。
@@ -39,6 +41,9 @@ class Item:
 
 
 class Box:
+    __slots__ = ('id', 'l', 'w', 'h', 'placed_items', 'volume', 'is_used_for_frozen',
+                 'available_positions', 'is_available')
+
     def __init__(self,id, l, w, h,is_used_for_frozen,available_positions):
         # 初始化 pack_space 类的实例，接收容器的 id、长度、宽度和高度作为参数
         self.id = id
@@ -48,11 +53,12 @@ class Box:
         self.placed_items = []  # 用于存储已放入容器中的盒子列表
         self.volume = l * w * h  # 计算容器的总体积
         self.is_used_for_frozen = is_used_for_frozen  # 冷冻容器标志
-        self.available_positions = available_positions
+        self.available_positions = list(available_positions)  # 复制一份，避免多个容器共用同一个列表
         self.is_available = True  # 容器可用性标志
 
 def preprocess_order(items,boxs):
     """预处理：若为冷冻订单，添加两个冰块"""
+    items = list(items)  # 不修改调用方的物品列表，重复调用时不会重复添加冰块
     if items[0].is_frozen:
         ice1 = Item(15,11,2.5, True)
         ice2 = Item(15, 11, 2.5, True)
@@ -65,9 +71,88 @@ def preprocess_order(items,boxs):
 
 
 
-def greedy_pack(items, boxes):
+def project_point(point, axis, placed):
+    """把候选点沿 axis 轴负方向投影到最近的已放置物品表面（没有物品时投影到容器壁）"""
+    others = [a for a in range(3) if a != axis]
+    coord = 0
+    for pos, dims in placed:
+        end = pos[axis] + dims[axis]
+        if coord < end <= point[axis] and all(pos[a] <= point[a] < pos[a] + dims[a] for a in others):
+            coord = end
+    projected = list(point)
+    projected[axis] = coord
+    return tuple(projected)
+
+
+def extreme_points(pos, dims, placed):
+    """新放置的物品产生的极点：三个方向的外角点，以及每个角点沿另外两轴投影后的点"""
+    points = []
+    for a in range(3):
+        corner = list(pos)
+        corner[a] += dims[a]
+        corner = tuple(corner)
+        points.append(corner)
+        for b in range(3):
+            if b != a:
+                points.append(project_point(corner, b, placed))
+    return points
+
+
+def extreme_point_pack(item_dims, box_dims, stats=None):
+    """
+    极点法装箱：按给定顺序逐个放置物品，候选点保存在按 (z, y, x) 排序的最小堆中
+    每件物品从最低、最靠里的候选点开始尝试各个方向；放不下的候选点暂存后放回堆中，留给后续较小的物品
+    返回各物品的 (位置, 放置尺寸)，有物品放不下时返回 None
+    stats: PackStats，统计弹出的候选点数、碰撞检查次数和候选点数峰值
+    """
+    item_dims = list(item_dims)
+    heap = [(0, 0, 0)]  # 候选点，按 (z, y, x) 存放
+    seen = {(0, 0, 0)}
+    placed = []
+    placed_index = SpatialGrid(grid_cell_size(item_dims))
+    for dims in item_dims:
+        orientations = sorted(set(itertools.permutations(dims)), reverse=True)
+        placement = None
+        skipped = []
+        while heap and placement is None:
+            z, y, x = heapq.heappop(heap)
+            if stats:
+                stats.count('points_popped')
+            for (l, w, h) in orientations:
+                if x + l > box_dims[0] or y + w > box_dims[1] or z + h > box_dims[2]:
+                    continue
+                if stats:
+                    stats.count('overlap_checks')
+                # 通过空间索引只检查附近已放置的物品
+                if not placed_index.overlaps((x, y, z), (l, w, h)):
+                    placement = ((x, y, z), (l, w, h))
+                    break
+            else:
+                skipped.append((z, y, x))
+        for point in skipped:
+            heapq.heappush(heap, point)
+        if placement is None:
+            return None
+
+        pos, dims = placement
+        placed.append(placement)
+        placed_index.insert(pos, dims)
+        for x, y, z in extreme_points(pos, dims, placed):
+            if (z, y, x) not in seen and x < box_dims[0] and y < box_dims[1] and z < box_dims[2]:
+                seen.add((z, y, x))
+                heapq.heappush(heap, (z, y, x))
+        if stats:
+            stats.peak('max_candidate_points', len(heap))
+    return placed
+
+
+def greedy_pack(items, boxes, stats=None):
     # 定义一个贪心算法函数，用于将商品尽可能高效地放入包装箱中
-    """贪心算法核心逻辑"""
+    """
+    贪心算法核心逻辑：物品按体积从大到小用极点法放入容器，依次尝试从小到大的容器
+    返回 (容器, 利用率)，box.placed_items 为放置顺序，可作为模拟退火的初始顺序
+    stats: PackStats，统计尝试和排除的容器数以及极点法的内部计数
+    """
     # 预处理：若为冷冻订单，添加两个冰块
 
     items, boxes = preprocess_order(items,boxes)
@@ -75,75 +160,47 @@ def greedy_pack(items, boxes):
 
     # 按体积从小到大对包装箱进行排序，以便优先使用体积较小的包装箱
     boxes_sorted = sorted(boxes, key=lambda b: b.volume)
-    boxes_sorted = [x for x in boxes_sorted if x.volume > sum([item.volume for item in items])]
+    # 预筛选可能装下全部物品的容器，跳过尺寸或体积上不可能可行的容器
+    candidates = boxes_sorted
+    boxes_sorted = screen_boxes(((item.l, item.w, item.h) for item in items), boxes_sorted,
+                                get_dims=lambda b: (b.l, b.w, b.h))
+    if stats:
+        stats.count('boxes_screened_out', len(candidates) - len(boxes_sorted))
     # 按体积从大到小对商品进行排序，以便优先放入体积较大的商品
     items_sorted = sorted(items, key=lambda x: x.volume, reverse=True)
 
     for box in boxes_sorted:
+        # 每次尝试都从空容器开始，物品和容器状态不受上一次尝试的影响
+        box.placed_items = []
+        box.is_available = True
         for item in items_sorted:
-            orientations = sorted(item.generate_orientations(),key=lambda x: (x[0],x[1],x[2]),reverse=True)
-
-            for (l,w,h) in orientations:
-                for pos in sorted(box.available_positions,key=lambda x: (x[2],x[1],x[0])):
-                    x,y,z = pos
-                    if x + l > box.l or y + w > box.w or z + h > box.h:
-                        continue
-
-                    overlap = False
-                    for placed_item in box.placed_items:
-                        px,py,pz = placed_item.positions
-                        pl,pw,ph = placed_item.orientations
-                        if not (x + l <= px or x >= px + pl or
-                                y + w <= py or y >= py + pw or
-                                z + h <= pz or z >= pz + ph):
-                            overlap = True
-                            break
-
-                    if not overlap:
-                        item.positions = (x,y,z)
-                        item.orientations = (l,w,h)
-                        box.placed_items.append(item)
-
-                        box.available_positions.remove(pos)
-
-                        new_available_positions=[]
-                        if x + l <= box.l: new_available_positions.append((x + l, y, z))
-                        if y + w <= box.w: new_available_positions.append((x, y + w, z))
-                        if z + h <= box.h: new_available_positions.append((x, y, z + h))
-
-                        box.available_positions.extend(new_available_positions)
-                        box.available_positions = sorted(list(set(box.available_positions)), key=lambda x : (x[2],x[1],x[0]))
-
-                        item.is_placed = True
-                        break
-                if item.is_placed:
-                    break
-
-            if not item.is_placed:
-                box.is_available = False
-                break
-
-        if box.is_available:
-            used_volume = sum(x.volume for x in box.placed_items)
-            utilization = used_volume / box.volume * 100
-            return box, utilization
-    return None, 0,0
+            item.positions = (0,0,0)
+            item.is_placed = False
+
+        if stats:
+            stats.count('boxes_tried')
+        placements = extreme_point_pack([(i.l, i.w, i.h) for i in items_sorted], (box.l, box.w, box.h), stats)
+        if placements is None:
+            box.is_available = False
+            if stats:
+                stats.count('boxes_rejected')
+            continue
+
+        for item, (pos, dims) in zip(items_sorted, placements):
+            item.positions = pos
+            item.orientations = dims
+            item.is_placed = True
+            box.placed_items.append(item)
+        used_volume = sum(x.volume for x in box.placed_items)
+        utilization = used_volume / box.volume * 100
+        return box, utilization
+    return None, 0
 
 if __name__=='__main__':
-    with open('box_inf.txt', 'r',encoding='utf-8') as f:
-        lines = f.readlines()
+    data = pd.read_excel('附件2-商品尺寸.xlsx')
 
-    boxs = []
+    boxs = [Box(*spec, [(0,0,0)]) for spec in load_catalogue('box_inf.txt').specs()]
     items = []
-    for line in lines:
-        if line.strip()[3] == '纸':
-            inf = line.strip().split(',')
-            box = Box(inf[0].strip("'"),float(inf[1]),float(inf[2]),float(inf[3]),False,[(0,0,0)])
-        else:
-            inf = line.strip().split(',')
-            box = Box(inf[0].strip("'"),float(inf[1]),float(inf[2]),float(inf[3]),True,[(0,0,0)])
-
-        boxs.append(box)
     for i in range(8):
         if data.iloc[i]['TL'] == '冷冻':
             item = Item(float(data.iloc[i]['L']), float(data.iloc[i]['W']), float(data.iloc[i]['H']), True)
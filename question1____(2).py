@@ -1,15 +1,16 @@
 import pandas as pd
 import numpy as np
+import bisect
 import itertools
+from box_catalogue import load_catalogue
+from box_screen import screen_boxes
 
-data = pd.read_excel('附件2-商品尺寸.xlsx')
-common_item = data[data['TL']=='常温']
-cold_item = data[data['TL']=='冷冻']
 
 
 
 class Item:
     # 定义一个名为 Box 的类，用于表示一个长方体盒子
+    __slots__ = ('l', 'w', 'h', 'is_frozen', 'volume', 'orientations', 'positions', 'is_placed')
 
     def __init__(self, l, w, h ,is_frozen,is_placed=False,orientations=None):
         # 定义类的构造函数，初始化盒子对象的属性。
@@ -39,6 +40,9 @@ class Item:
 
 
 class Box:
+    __slots__ = ('id', 'l', 'w', 'h', 'placed_items', 'volume', 'is_used_for_frozen',
+                 'available_positions', 'is_available', 'available_regions')
+
     def __init__(self,id, l, w, h,is_used_for_frozen,available_positions):
         # 初始化 pack_space 类的实例，接收容器的 id、长度、宽度和高度作为参数
         self.id = id
@@ -53,6 +57,7 @@ class Box:
 
 def preprocess_order(items,boxs):
     """预处理：若为冷冻订单，添加两个冰块"""
+    items = list(items)  # 不修改调用方的物品列表，重复调用时不会重复添加冰块
     if items[0].is_frozen:
         ice1 = Item(15,11,2.5, True)
         ice2 = Item(15, 11, 2.5, True)
@@ -128,80 +133,130 @@ def preprocess_order(items,boxs):
 
 
 
-def greedy_pack(items, boxes):
+class RegionIndex:
+    """
+    空闲区域索引，区域为 (x, y, z, l, w, h)
+    区域按体积有序保存，最优匹配时直接跳过体积小于物品的区域；
+    另按区域在 X/Y 方向上的起止面登记，合并时只查找与新区域相邻的区域
+    """
+    def __init__(self, l, w, h, stats=None):
+        self.stats = stats    # PackStats，统计合并次数、扫描和跳过的区域数
+        self.regions = {}     # 编号 -> 区域
+        self.by_volume = []   # (体积, 编号)，按体积升序
+        self.starts = {}      # 起始面 -> 编号
+        self.ends = {}        # 结束面 -> 编号
+        self.next_id = 0
+        self.add((0, 0, 0, l, w, h))
+
+    @staticmethod
+    def _faces(region):
+        """区域的 (起始面, 结束面) 键：Z 方向位置和高度相同、另一方向位置和尺寸相同的区域才能合并"""
+        x, y, z, l, w, h = region
+        return (('x', y, w, z, h, x), ('y', x, l, z, h, y)), (('x', y, w, z, h, x + l), ('y', x, l, z, h, y + w))
+
+    def add(self, region):
+        """加入一个区域，与相邻区域合并后登记"""
+        x, y, z, l, w, h = region
+        starts, ends = self._faces(region)
+        # 与结束于本区域起始面、或起始于本区域结束面的相邻区域合并（合并结果继续尝试合并）
+        for key, index in ((starts[0], self.ends), (starts[1], self.ends), (ends[0], self.starts), (ends[1], self.starts)):
+            if key in index:
+                mx, my, mz, ml, mw, mh = self.remove(index[key])
+                if self.stats:
+                    self.stats.count('merges')
+                if key[0] == 'x':
+                    merged = (min(x, mx), y, z, l + ml, w, h)
+                else:
+                    merged = (x, min(y, my), z, l, w + mw, h)
+                self.add(merged)
+                return
+
+        region_id = self.next_id
+        self.next_id += 1
+        self.regions[region_id] = region
+        bisect.insort(self.by_volume, (l * w * h, region_id))
+        for key in starts:
+            self.starts[key] = region_id
+        for key in ends:
+            self.ends[key] = region_id
+
+    def remove(self, region_id):
+        """删除并返回一个区域"""
+        region = self.regions.pop(region_id)
+        x, y, z, l, w, h = region
+        del self.by_volume[bisect.bisect_left(self.by_volume, (l * w * h, region_id))]
+        starts, ends = self._faces(region)
+        for key in starts:
+            if self.starts.get(key) == region_id:
+                del self.starts[key]
+        for key in ends:
+            if self.ends.get(key) == region_id:
+                del self.ends[key]
+        return region
+
+    def best_fit(self, orientations, volume):
+        """
+        在能放下物品的区域中找剩余空间 (rl-l)*(rw-w)*(rh-h) 最小的位置，返回 (区域编号, 放置尺寸)，找不到时返回 None
+        区域按体积从小到大检查，剩余空间相同时优先体积较小的区域；区域尺寸由减法得到，有浮点误差，
+        体积剪枝和尺寸比较都留出 1e-9 的相对 / 绝对容差，尺寸与物品恰好相同的区域不会被漏掉
+        """
+        best, remaining_space = None, float('inf')
+        first = bisect.bisect_left(self.by_volume, (volume * (1 - 1e-9), -1))
+        if self.stats:
+            self.stats.count('regions_pruned', first)
+            self.stats.peak('max_free_regions', len(self.by_volume))
+        for _, region_id in self.by_volume[first:]:
+            if self.stats:
+                self.stats.count('regions_scanned')
+            rx, ry, rz, rl, rw, rh = self.regions[region_id]
+            for (l, w, h) in orientations:
+                if l > rl + 1e-9 or w > rw + 1e-9 or h > rh + 1e-9:
+                    continue
+                current_space = max(rl - l, 0) * max(rw - w, 0) * max(rh - h, 0)
+                if current_space < remaining_space:
+                    remaining_space = current_space
+                    best = (region_id, (l, w, h))
+            if remaining_space == 0:
+                break  # 已经完全贴合，不可能更优
+        return best
+
+
+def greedy_pack(items, boxes, stats=None):
+    """最优匹配贪心：stats 为 PackStats 时统计尝试和排除的容器数以及区域索引的内部计数"""
     items, boxes = preprocess_order(items, boxes)
     boxes_sorted = sorted(boxes, key=lambda b: b.volume)
-    boxes_sorted = [x for x in boxes_sorted if x.volume > sum([item.volume for item in items])]
+    # 预筛选可能装下全部物品的容器，跳过尺寸或体积上不可能可行的容器
+    candidates = boxes_sorted
+    boxes_sorted = screen_boxes(((item.l, item.w, item.h) for item in items), boxes_sorted,
+                                get_dims=lambda b: (b.l, b.w, b.h))
+    if stats:
+        stats.count('boxes_screened_out', len(candidates) - len(boxes_sorted))
     items_sorted = sorted(items, key=lambda x: x.volume, reverse=True)
-
-    def merge_regions(regions):
-        merged = []
-        for r in sorted(regions, key=lambda x: (x[2], x[1], x[0])):
-            x, y, z, l, w, h = r
-            found = False
-            for i in range(len(merged)):
-                mx, my, mz, ml, mw, mh = merged[i]
-                # 合并垂直方向(Z轴)相同且XY面重叠的区域
-                if z == mz and h == mh:
-                    if (x == mx and l == ml and (y == my + mw or my == y + w)):
-                        new_w = max(y + w, my + mw) - min(y, my)
-                        merged[i] = (x, min(y, my), z, l, new_w, h)
-                        found = True
-                        break
-                    if (y == my and w == mw and (x == mx + ml or mx == x + l)):
-                        new_l = max(x + l, mx + ml) - min(x, mx)
-                        merged[i] = (min(x, mx), y, z, new_l, w, h)
-                        found = True
-                        break
-            if not found:
-                merged.append(r)
-        return merged
+    # 生成所有可能方向并按底面积排序，每件物品只生成一次，各容器共用
+    item_orientations = [sorted(item.generate_orientations(), key=lambda dim: (-dim[0]*dim[1], -dim[2]))
+                         for item in items_sorted]
 
     for box in boxes_sorted:
         box.placed_items = []
-        box.available_regions = [(0, 0, 0, box.l, box.w, box.h)]  # (x, y, z, l, w, h)
+        regions = RegionIndex(box.l, box.w, box.h, stats)
+        if stats:
+            stats.count('boxes_tried')
 
         all_placed = True
-        for item in items_sorted:
-            best_position = None
-            best_orientation = None
-            remaining_space = float('inf')
+        for item, orientations in zip(items_sorted, item_orientations):
+            best = regions.best_fit(orientations, item.volume)
 
-            # 生成所有可能方向并按底面积排序
-            orientations = sorted(item.generate_orientations(),
-                                key=lambda dim: (-dim[0]*dim[1], -dim[2]))
+            if best:
+                region_id, (l, w, h) = best
+                x, y, z, rl, rw, rh = regions.remove(region_id)
 
-            for (l, w, h) in orientations:
-                for i, region in enumerate(box.available_regions):
-                    rx, ry, rz, rl, rw, rh = region
-                    if l > rl or w > rw or h > rh:
-                        continue
-
-                    # 优先选择空间利用率更高的位置
-                    current_space = (rl - l) * (rw - w) * (rh - h)
-                    if current_space < remaining_space:
-                        remaining_space = current_space
-                        best_position = (rx, ry, rz, i)
-                        best_orientation = (l, w, h)
-
-            if best_position:
-                x, y, z, region_idx = best_position
-                l, w, h = best_orientation
-                region = box.available_regions.pop(region_idx)
-                rx, ry, rz, rl, rw, rh = region
-
-                # 添加分割后的新区域
-                new_regions = []
-                if rl - l > 0:  # 右侧剩余空间
-                    new_regions.append((x + l, y, z, rl - l, w, rh))
-                if rw - w > 0:  # 前方剩余空间
-                    new_regions.append((x, y + w, z, l, rw - w, rh))
-                if rh - h > 0:  # 上方剩余空间
-                    new_regions.append((x, y, z + h, l, w, rh - h))
-
-                # 合并相邻空间
-                box.available_regions += new_regions
-                box.available_regions = merge_regions(box.available_regions)
+                # 添加分割后的新区域，并与相邻空间合并
+                if rl - l > 1e-9:  # 右侧剩余空间（忽略浮点误差造成的薄片）
+                    regions.add((x + l, y, z, rl - l, rw, rh))
+                if rw - w > 1e-9:  # 前方剩余空间
+                    regions.add((x, y + w, z, l, rw - w, rh))
+                if rh - h > 1e-9:  # 上方剩余空间
+                    regions.add((x, y, z + h, l, w, rh - h))
 
                 # 记录物品位置
                 item.positions = (x, y, z)
@@ -209,8 +264,11 @@ def greedy_pack(items, boxes):
                 box.placed_items.append(item)
             else:
                 all_placed = False
+                if stats:
+                    stats.count('boxes_rejected')
                 break
 
+        box.available_regions = list(regions.regions.values())  # (x, y, z, l, w, h)
         if all_placed:
             used_volume = sum(x.volume for x in box.placed_items)
             utilization = used_volume / box.volume * 100
@@ -218,20 +276,10 @@ def greedy_pack(items, boxes):
     return None, 0
 
 if __name__=='__main__':
-    with open('box_inf.txt', 'r',encoding='utf-8') as f:
-        lines = f.readlines()
+    data = pd.read_excel('附件2-商品尺寸.xlsx')
 
-    boxs = []
+    boxs = [Box(*spec, [(0,0,0)]) for spec in load_catalogue('box_inf.txt').specs()]
     items = []
-    for line in lines:
-        if line.strip()[3] == '纸':
-            inf = line.strip().split(',')
-            box = Box(inf[0].strip("'"),float(inf[1]),float(inf[2]),float(inf[3]),False,[(0,0,0)])
-        else:
-            inf = line.strip().split(',')
-            box = Box(inf[0].strip("'"),float(inf[1]),float(inf[2]),float(inf[3]),True,[(0,0,0)])
-
-        boxs.append(box)
     for i in range(5):
         if data.iloc[i]['TL'] == '冷冻':
             item = Item(float(data.iloc[i]['L']), float(data.iloc[i]['W']), float(data.iloc[i]['H']), True)
@@ -1,30 +1,40 @@
+import argparse
 import itertools
+import json
+import sys
+from functools import lru_cache
 import math
 import random
-import pandas as pd
+import time
 import numpy as np
+from box_catalogue import load_catalogue
+from box_screen import screen_boxes
+from energy_model import EnergyModel
+from order_stream import load_sku_table
+from pack_cache import encode_result
+from parallel_pack import parallel_pack
 # random.seed(247555)
 
-data = pd.read_excel('附件2-商品尺寸.xlsx')
-
 """
 基于模拟退火算法的三维装箱优化方案
 核心功能：通过模拟退火算法优化物品装箱顺序和方向，提高容器空间利用率
 """
 
-# 读取数据
-# 预处理原始数据，分离常温/冷冻物品
-common_item = data[data['TL']=='常温']  # 从原始数据筛选常温物品
-cold_item = data[data['TL']=='冷冻']    # 从原始数据筛选冷冻物品
+ENERGY_WEIGHTS = (0.6, 0.4)  # 能量函数中体积利用率和紧凑度的权重
 
 class Item:
     """物品类，封装物品属性和放置信息"""
-    def __init__(self, l, w, h, is_frozen):
+    __slots__ = ('dims', 'is_frozen', 'volume', 'orientation', 'position', 'orientations', 'sku')
+
+    def __init__(self, l, w, h, is_frozen, sku=None, orientations=None):
         self.dims = (l, w, h)       # 物品原始尺寸（长宽高）
         self.is_frozen = is_frozen  # 是否冷冻物品标志
         self.volume = l * w * h     # 计算物品体积
         self.orientation = (l,w,h)   # 当前放置方向（尺寸排列组合）
         self.position = (0, 0, 0)     # 在容器中的坐标(x,y,z)
+        self.sku = sku              # 在 SkuCatalogue 中的行号（不是目录中的商品时为 None）
+        # 全部不重复的摆放方向，已按底面积降序、高度升序排列（目录商品直接引用目录中的方向表）
+        self.orientations = orientations or sorted_orientations(self.dims)
 
     def get_current_size(self):
         """获取物品当前方向的实际尺寸"""
@@ -32,18 +42,21 @@ class Item:
 
 class Box:
     """容器类，描述装箱容器属性及装载状态"""
+    __slots__ = ('id', 'dims', 'volume', 'is_used_for_frozen', 'used_space', 'checkpoints')
+
     def __init__(self, id, l, w, h, is_used_for_frozen):
         self.id = id                # 容器唯一标识
         self.dims = (l, w, h)       # 容器尺寸（长宽高）
         self.volume = l * w * h     # 容器总容积
         self.is_used_for_frozen = is_used_for_frozen  # 是否冷冻专用容器
-        self.used_space = []        # 已装载物品信息列表
+        self.used_space = []        # 已装载物品信息列表，每项为 (位置, 放置尺寸, 物品)
+        self.checkpoints = []       # 布局检查点：[碎片体积下限, (物品, 空闲空间, 放置记录), ...]
 
 def preprocess_order(items, boxes):
-    """订单预处理逻辑：冷冻订单添加冰块并过滤容器"""
+    """订单预处理逻辑：冷冻订单添加冰块并过滤容器，返回新的物品列表，不修改传入的列表"""
     if items[0].is_frozen:
         # 添加两个标准尺寸的冰块（15*11*2.5cm）
-        items += [Item(15, 11, 2.5, True) for _ in range(2)]
+        items = items + [Item(15, 11, 2.5, True) for _ in range(2)]
         # 筛选适合冷冻物品的容器
         boxes = [b for b in boxes if b.is_used_for_frozen]
     else:
@@ -52,12 +65,48 @@ def preprocess_order(items, boxes):
     return items, boxes
 
 
-# 相邻空间合并策略
-def merge_space(free_regions):
-    pass
-
-def block_merge(items):
-    pass
+class Block(Item):
+    """物品块：多件相同物品沿最短边叠放成的整体，布局时作为一件物品放置"""
+    __slots__ = ('members', 'thickness')
+
+    def __init__(self, members):
+        s0, s1, s2 = sorted(members[0].dims)
+        super().__init__(s2, s1, s0 * len(members), members[0].is_frozen)
+        self.members = members   # 组成物品块的单件物品
+        self.thickness = s0      # 单件物品在叠放方向上的厚度
+
+    def place_members(self):
+        """根据物品块的位置和方向，计算每件成员物品的位置和方向"""
+        axis = self.orientation.index(self.dims[2])  # 叠放方向所在的坐标轴
+        for k, member in enumerate(self.members):
+            position = list(self.position)
+            position[axis] += k * self.thickness
+            orientation = list(self.orientation)
+            orientation[axis] = self.thickness
+            member.position = tuple(position)
+            member.orientation = tuple(orientation)
+
+
+def block_merge(items, max_count=4):
+    """把相同尺寸的物品每 max_count 件合并成一个物品块，返回新的待装物品列表（保持首次出现的顺序）"""
+    groups = {}
+    for item in items:
+        groups.setdefault((tuple(sorted(item.dims)), item.is_frozen), []).append(item)
+
+    units = []
+    for group in groups.values():
+        for start in range(0, len(group), max_count):
+            members = group[start:start + max_count]
+            units.append(Block(members) if len(members) > 1 else members[0])
+    return units
+
+
+def expand_blocks(units):
+    """把物品块展开为单件物品"""
+    items = []
+    for unit in units:
+        items.extend(getattr(unit, 'members', (unit,)))
+    return items
 
 
 def check_overlap(pos1, dims1, pos2, dims2):
@@ -72,123 +121,200 @@ def check_overlap(pos1, dims1, pos2, dims2):
     return x_overlap and y_overlap and z_overlap
 
 
-def layout_items(items, box):
-    """核心装箱布局算法（带空间分割策略）"""
+@lru_cache(maxsize=None)
+def sorted_orientations(dims):
+    """物品不重复的摆放方向，按底面积降序、高度升序排列（相同尺寸只计算一次，与 SkuCatalogue 的方向表一致）"""
+    orientations = sorted(itertools.permutations(dims), key=lambda d: (-d[0] * d[1], d[2]))
+    return tuple(o for k, o in enumerate(orientations) if o not in orientations[:k])
+
+
+def contains(outer, inner, eps=1e-9):
+    """判断空间 outer 是否完全包含空间 inner（空间为 (位置, 尺寸) 元组，允许浮点误差 eps）"""
+    (o_pos, o_dims), (i_pos, i_dims) = outer, inner
+    for a in range(3):
+        if i_pos[a] < o_pos[a] - eps:
+            return False
+        if i_pos[a] + i_dims[a] > o_pos[a] + o_dims[a] + eps:
+            return False
+    return True
+
+
+def fragment_bounds(items):
+    """过滤碎片空间的下限 (最小单件物品的体积, 最小单件物品的最短边)：体积或任一边小于下限的空间放不下任何物品"""
+    singles = expand_blocks(items)
+    return min(i.volume for i in singles), min(min(i.dims) for i in singles)
+
+
+def split_space(free_regions, pos, dims, bounds):
+    """
+    按新放置的物品切分与其相交的空闲空间，返回 (未受影响的空间, 切分出的新空间)
+    每个相交的空间在物品的 6 个面外侧各切出一个子空间，子空间在另外两个方向上保持原空间的全部尺寸
+    bounds: fragment_bounds 给出的 (体积下限, 边长下限)，放不下任何物品的子空间直接丢弃
+    """
+    min_volume, min_side = bounds
+    untouched, pieces = [], []
+    for region in free_regions:
+        r_pos, r_dims = region
+        if not check_overlap(r_pos, r_dims, pos, dims):
+            untouched.append(region)
+            continue
+        for a in range(3):
+            # 物品在该方向负侧的剩余空间
+            if pos[a] > r_pos[a]:
+                new_dims = list(r_dims)
+                new_dims[a] = pos[a] - r_pos[a]
+                pieces.append((r_pos, tuple(new_dims)))
+            # 物品在该方向正侧的剩余空间
+            end, r_end = pos[a] + dims[a], r_pos[a] + r_dims[a]
+            if r_end > end:
+                new_pos, new_dims = list(r_pos), list(r_dims)
+                new_pos[a], new_dims[a] = end, r_end - end
+                pieces.append((tuple(new_pos), tuple(new_dims)))
+
+    # 过滤掉太小或太薄的空间，避免碎片化（这些空间放不下任何物品，删除后布局结果不变）
+    pieces = [r for r in pieces if r[1][0] * r[1][1] * r[1][2] >= min_volume and min(r[1]) >= min_side]
+    return untouched, pieces
+
+
+def merge_space(free_regions, new_regions, eps=1e-9):
+    """
+    维护最大空闲空间列表：被其他空间包含的空间直接删除
+    切分出的子空间都是各自方向上的最大空间，相邻空间之间本身已相互覆盖，不需要再拼接
+    free_regions 为 split_space 返回的未受影响空间，它们之间互不包含；新空间位于被切分的原空间之内，
+    不可能包含未受影响的空间，所以只在新空间之间删除被包含的空间，结果与逐个比较全部空间相同
+    """
+    # 预先算好各空间放宽 eps 后的边界 (x0, y0, z0, x1, y1, z1)，判断新空间是否被包含时不再逐对调用 contains
+    outer = [(x - eps, y - eps, z - eps, x + w + eps, y + h + eps, z + d + eps)
+             for (x, y, z), (w, h, d) in free_regions]
+    accepted, accepted_outer = [], []
+    for new in new_regions:
+        (x, y, z), (w, h, d) = new
+        x1, y1, z1 = x + w, y + h, z + d
+        if any(x >= b[0] and y >= b[1] and z >= b[2] and x1 <= b[3] and y1 <= b[4] and z1 <= b[5]
+               for b in itertools.chain(outer, accepted_outer)):
+            continue
+        kept = [k for k, r in enumerate(accepted) if not contains(new, r, eps)]
+        accepted = [accepted[k] for k in kept] + [new]
+        accepted_outer = [accepted_outer[k] for k in kept] + [(x - eps, y - eps, z - eps, x1 + eps, y1 + eps, z1 + eps)]
+    return free_regions + accepted
+
+
+def restore_checkpoint(items, box, bounds):
+    """
+    从容器上一次布局的检查点恢复：找出本次物品顺序与上次布局相同的最长前缀，
+    恢复前缀放置完成后的空闲空间和放置记录，返回 (继续放置的起始下标, 空闲空间列表)
+    bounds: 碎片空间下限，与上次布局不同时检查点全部失效
+    """
+    checkpoints = box.checkpoints
+    if not checkpoints or checkpoints[0] != bounds:
+        box.checkpoints = [bounds]
+        return 0, [((0,0,0), box.dims)]
+    start = 0
+    limit = min(len(items), len(checkpoints) - 1)
+    while start < limit and checkpoints[start + 1][0] is items[start]:
+        start += 1
+    del checkpoints[start + 1:]
+    if not start:
+        return 0, [((0,0,0), box.dims)]
+
+    # 物品对象可能已被其他布局移动，按检查点中的放置记录恢复前缀物品的位置和方向
+    for _, _, placements in checkpoints[1:]:
+        for pos, dim, item in placements:
+            box.used_space.append((pos, dim, item))
+            item.position = pos
+            item.orientation = dim
+            if isinstance(item, Block):
+                item.place_members()
+    return start, list(checkpoints[start][1])
+
+
+def layout_items(items, box, energy=None, stats=None):
+    """
+    核心装箱布局算法（最大空闲空间策略），物品块放不下时拆成单件继续放置
+    每放完一个物品（块）在 box.checkpoints 中记录一次空闲空间和放置记录，
+    下次布局时与上次顺序相同的前缀直接从检查点恢复，只重新放置变化之后的物品
+    energy: 该容器的 EnergyModel，布局时同步回退和加入放置记录
+    stats: PackStats，统计布局次数、复用的前缀、扫描的空间数和空间数峰值等
+    """
     if not box:
         return
     box.used_space = []  # 重置容器装载状态
-    # 初始化可用区域列表，起始为整个容器空间
-    free_regions = [{'pos': (0,0,0), 'dims': box.dims}]
-
-    for item in items:  # 遍历所有待装物品
-        placed = False  # 物品放置状态标记
-        # 按空间利用率和最大尺寸排序可用区域（优先选择大且紧凑的空间）
-        free_regions.sort(key=lambda r: (r['dims'][0]*r['dims'][1]*r['dims'][2],  # 区域体积降序
-            -max(r['dims'])  # 最大尺寸升序（优先较小最大尺寸）优先选择最大尺寸较小的区域，因为较小的最大尺寸意味着区域更紧凑，更有可能成功放置物品。
-        ))
-
-        # 遍历所有可用区域尝试放置
-        for i, region in enumerate(free_regions):
-            r_pos = region['pos']  # 区域起始坐标
-            r_dims = region['dims']  # 区域尺寸
-
-
-            # 生成物品所有可能方向，并按底面积和高度排序（优先大底面积方向）
-            for dim in sorted(itertools.permutations(item.dims),
-                              key=lambda d: (-d[0] * d[1], d[2])):  # 优先选择底面积大的方向
-                # 检查当前方向是否适合当前区域
-                # 检查是否与已放置的物品重叠
-                overlap = False
-                for used_item in box.used_space:
-                    if check_overlap(r_pos, dim, used_item['pos'], used_item['dims']):
-                        overlap = True
+    if not items:
+        return True
+    # 过滤碎片空间的下限：最小单件物品的体积和最短边
+    bounds = fragment_bounds(items)
+    # 空闲空间列表，每项为 (位置, 尺寸)，没有可用检查点时为整个容器空间
+    start, free_regions = restore_checkpoint(items, box, bounds)
+    if energy:
+        energy.rollback(len(box.used_space))
+    if stats:
+        stats.count('layouts')
+        stats.count('resumed_units', start)
+
+    for unit in items[start:]:
+        placed_from = len(box.used_space)
+        pending = [unit]  # 待放置物品栈，物品块拆开后成员物品压回栈顶
+        while pending:
+            item = pending.pop()
+            placed = False  # 物品放置状态标记
+            # 按空间利用率和最大尺寸排序可用区域（优先选择大且紧凑的空间）
+            free_regions.sort(key=lambda r: (r[1][0]*r[1][1]*r[1][2],  # 区域体积降序
+                -max(r[1])  # 最大尺寸升序（优先较小最大尺寸）优先选择最大尺寸较小的区域，因为较小的最大尺寸意味着区域更紧凑，更有可能成功放置物品。
+            ))
+
+            # 物品所有可能方向，已按底面积和高度排序（优先大底面积方向）
+            orientations = item.orientations
+            # 遍历所有可用区域尝试放置
+            for r_pos, r_dims in free_regions:  # 区域起始坐标和尺寸
+                for dim in orientations:
+                    # 空闲空间内没有已放置的物品，只需检查尺寸是否合适
+                    if all(d <= rd for d, rd in zip(dim, r_dims)):
+                        placed = True
                         break
-
-                if overlap:
-                    continue
-
-                if all(d <= rd for d, rd in zip(dim, r_dims)):
-                    # 记录物品放置信息
-                    new_pos = (
-                        r_pos[0],
-                        r_pos[1],
-                        r_pos[2]
-                    )
-
-
-                    item.position = new_pos
-                    item.orientation = dim
-
-                    box.used_space.append({
-                        'pos': new_pos,
-                        'dims': dim,
-                        'item': item
-                    })
-
-                    # 空间分割处理
-                    new_regions = []
-
-                                        # X方向剩余空间
-                    if r_dims[0] - dim[0] > 0:
-                        new_regions.append({
-                            'pos': (r_pos[0] + dim[0], r_pos[1], r_pos[2]),
-                            'dims': (r_dims[0] - dim[0], r_dims[1], r_dims[2])
-                        })
-
-                    # Y方向剩余空间
-                    if r_dims[1] - dim[1] > 0:
-                        new_regions.append({
-                            'pos': (r_pos[0], r_pos[1] + dim[1], r_pos[2]),
-                            'dims': (r_dims[0], r_dims[1] - dim[1], r_dims[2])
-                        })
-
-                    # Z方向剩余空间
-                    if r_dims[2] - dim[2] > 0:
-                        new_regions.append({
-                            'pos': (r_pos[0], r_pos[1], r_pos[2] + dim[2]),
-                            'dims': (r_dims[0], r_dims[1], r_dims[2] - dim[2])
-                        })
-
-
-                    # 更新可用区域列表
-                    del free_regions[i]
-                    # 过滤掉太小的区域，避免碎片化
-                    min_volume = min(i.volume for i in items)
-                    new_regions = [r for r in new_regions
-                                   if r['dims'][0] * r['dims'][1] * r['dims'][2] >= min_volume]
-                    free_regions.extend(new_regions)
-
-                    placed = True
+                if placed:
                     break
-
-            if placed:
-                break
-
-        if not placed:
-            box.used_space = []  # 重置容器装载状态
-            return False  # 放置失败终止装箱
+            if stats:
+                stats.count('placements_tried')
+                stats.peak('max_free_regions', len(free_regions))
+
+            if not placed:
+                if isinstance(item, Block):
+                    if stats:
+                        stats.count('block_splits')
+                    pending.extend(reversed(item.members))  # 物品块放不下，拆成单件逐个放置
+                    continue
+                box.used_space = []  # 重置容器装载状态
+                if stats:
+                    stats.count('layout_failures')
+                return False  # 放置失败终止装箱
+
+            # 记录物品放置信息
+            item.position = r_pos
+            item.orientation = dim
+            if isinstance(item, Block):
+                item.place_members()
+            box.used_space.append((r_pos, dim, item))
+            if energy:
+                energy.push(r_pos, dim)
+
+            # 按新放置的物品切分空闲空间，并删除被包含的空间
+            if stats:
+                stats.count('overlap_checks', len(free_regions))
+            free_regions, new_regions = split_space(free_regions, r_pos, dim, bounds)
+            free_regions = merge_space(free_regions, new_regions)
+
+        # 记录检查点：该物品（块）放置完成后的空闲空间和新增的放置记录
+        box.checkpoints.append((unit, tuple(free_regions), tuple(box.used_space[placed_from:])))
 
     return True  # 所有物品成功放置
 
 
-def calculate_energy(box, items):
-    """计算布局能量值（目标函数）"""
-    used_volume = sum(i.volume for i in items)  # 已使用体积
-    total_volume = box.volume  # 容器总容积
-
-
-    # 紧凑度惩罚项（计算X，Y，Z轴方向最大延伸长度占比）
-    max_coord_x = max(
-        i.position[0] + i.orientation[0] for i in items
-    ) if items else 0
-    max_coord_y = max(
-        i.position[1] + i.orientation[1] for i in items
-    ) if items else 0
-    max_coord_z = max(
-        i.position[2] + i.orientation[2] for i in items
-    ) if items else 0
-
-    dim_fill_rate = max_coord_x / box.dims[0]* max_coord_y / box.dims[1]* max_coord_z / box.dims[2]
+def calculate_energy(box, items, weights=ENERGY_WEIGHTS):
+    """计算布局能量值（目标函数），按容器的全部放置记录重新计算；退火过程中由 EnergyModel 增量维护"""
+    # 体积项 + 紧凑度项（X，Y，Z轴方向最大延伸长度占比），按实际放置记录计算，物品块拆开时同样适用
+    energy = EnergyModel(box, items, *weights)
+    for pos, dims, _ in box.used_space:
+        energy.push(pos, dims)
     # # 高度差惩罚项（计算物品高度差）
     # # 除了计算X，Y，Z轴方向最大延伸长度占比，还应该计算并选择能够最大程度减小高度差的放置方案，使得物品尽可能紧凑。
     # z_positions = [i.position[2]+i.orientation[2] for i in items]
@@ -203,7 +329,7 @@ def calculate_energy(box, items):
     # z_positions_std_normalized = z_positions_std / range_z_positions if range_z_positions > 0 else 0
 
     # 综合能量计算
-    return (used_volume / total_volume) * 0.6  + dim_fill_rate * 0.4, box
+    return energy.energy(), box
 
 
 
@@ -215,68 +341,103 @@ def block_exchange(new_order, start, length, target):
     return new_order
 
 
-def neighbor_generator(current_order, mutation_rate=0.5):
-    """邻居状态生成器（混合变异策略）"""
+def neighbor_generator(current_order, mutation_rate=0.5, rng=random):
+    """邻居状态生成器（混合变异策略），rng 为随机数生成器（random.Random 实例，默认使用全局 random 模块）"""
     new_order = current_order.copy()  # 复制当前状态
+    if len(new_order) < 2:
+        return new_order  # 单件订单（或合并成一个物品块的订单）没有可交换的位置
 
-    if random.random() < mutation_rate:
+    if rng.random() < mutation_rate:
         # 单点变异：交换两个随机物品位置
-        i, j = random.sample(range(len(new_order)), 2)
+        i, j = rng.sample(range(len(new_order)), 2)
         new_order[i], new_order[j] = new_order[j], new_order[i]
     else:
         # 块变异：交换连续物品段（增强局部搜索能力）
-        start = random.randint(0, len(new_order)-2)  # 随机起始位置
-        length = random.randint(1, min(3, len(new_order)-start))  # 块长度1-3
+        start = rng.randint(0, len(new_order)-2)  # 随机起始位置
+        length = rng.randint(1, min(3, len(new_order)-start))  # 块长度1-3
         # 随机目标位置
-        target = random.randint(0, len(new_order)-length)
+        target = rng.randint(0, len(new_order)-length)
         # 执行块交换
         new_order = block_exchange(new_order, start, length, target)
 
 
     return new_order
 
-def simulated_annealing_pack(items, boxes, initial_temp=1000, cooling_rate=0.995, final_temp=1):
-    """模拟退火主算法"""
+def simulated_annealing_pack(items, boxes, initial_temp=1000, cooling_rate=0.995, final_temp=1, layout_fn=layout_items,
+                             energy_weights=ENERGY_WEIGHTS, initial_order=None, deadline=None,
+                             rng=random, stats=None):
+    """
+    模拟退火主算法，layout_fn 为布局实现（layout_items 或 layout_numpy.layout_items_np）
+    energy_weights: 能量函数中 (体积利用率, 紧凑度) 的权重
+    initial_order: 初始放置顺序（如极点法贪心 box.placed_items 对应的物品顺序），为 None 时按体积降序
+    deadline: 截止时刻（time.perf_counter() 的取值），到达后停止降温并返回目前最好的结果
+    rng: 随机数生成器，传入由种子创建的 random.Random 实例时结果可复现（默认使用全局 random 模块）
+    stats: PackStats，统计迭代次数、布局缓存命中、被排除的容器和各步的能量与接受情况
+    """
     for i in items:
         i.position = (0, 0, 0)  # 重置物品位置信息
         i.orientation = (i.dims[0], i.dims[1], i.dims[2])
-    # 选择最小可用容器（体积刚好满足物品总体积）
-    boxes = sorted([b for b in boxes if b.volume >= sum(i.volume for i in items)],key=lambda x: x.volume)
+    # 预筛选可能装下全部物品的容器（尺寸支配关系 + 体积和装箱下界），按体积从小到大排列
+    candidates = boxes
+    boxes = screen_boxes((i.dims for i in items), boxes)
+    if stats:
+        stats.count('boxes_screened_out', len(candidates) - len(boxes))
     if not boxes:
         return None, None,0, 0  # 无可用容器直接返回
-    # 初始化状态：按体积和最大尺寸降序排列
-    current_order = sorted(items, key=lambda x: (-x.volume, -max(x.dims)))
+    # 初始化状态：给定初始顺序时从该顺序开始，否则按体积和最大尺寸降序排列
+    # 相同物品合并为物品块，减少需要排列和逐个放置的单元数
+    if initial_order:
+        current_order = block_merge(initial_order)
+    else:
+        current_order = sorted(block_merge(items), key=lambda x: (-x.volume, -max(x.dims)))
     best_order = current_order.copy()  # 记录最佳状态
-    best_energy = 0  # 最佳能量值
     current_temp = initial_temp  # 初始化温度
-    smallest_box = None # 选择最小可用容器
+
+    # 布局缓存：能量只取决于物品（块）尺寸的排列顺序，相同排列不再重复布局
+    layout_memo = {}
+    # 每个容器一个能量模型，与容器上的布局检查点同步回退
+    energies = {}
+    for box in boxes:
+        box.checkpoints = []
+        energies[box.id] = EnergyModel(box, items, *energy_weights)
+
+    def evaluate(order):
+        """返回排列 order 的 (能量, 容器)，依次尝试从小到大的容器"""
+        key = tuple((i.dims, len(getattr(i, 'members', ()))) for i in order)
+        if key not in layout_memo:
+            if stats:
+                start = time.perf_counter()
+            result = (0, None)
+            for box in boxes:
+                if layout_fn(order, box, energies[box.id], stats):
+                    result = (energies[box.id].energy(), box)
+                    break
+                if stats:
+                    stats.count('boxes_rejected')
+            layout_memo[key] = result
+            if stats:
+                stats.add_time('layout', time.perf_counter() - start)
+        elif stats:
+            stats.count('memo_hits')
+        return layout_memo[key]
+
+    current_energy, current_box = evaluate(current_order)
+    # 初始状态也是候选结果：截止时刻在第一轮之前就已到达时按初始状态返回
+    best_energy, smallest_box = current_energy, current_box  # 最佳能量值和最小可用容器
     # 退火循环
     while current_temp > final_temp:
+        if deadline is not None and time.perf_counter() > deadline:
+            break  # 时间用完，按目前最好的状态返回
         # 生成邻居状态
-        if random.random()*current_temp >0.5:
-            new_order = neighbor_generator(current_order)
+        if rng.random()*current_temp >0.5:
+            new_order = neighbor_generator(current_order, rng=rng)
         else:
             new_order = current_order.copy()
 
-        # 尝试新布局并计算能量
-        for box in boxes:
-            success = layout_items(new_order, box)
-            if success:
-                new_energy,new_box = calculate_energy(box, new_order)
-                break
-            else:
-                new_energy = 0
-                new_box = None
-
-        for box in boxes:
-            success = layout_items(current_order, box)
-            if success:
-                current_energy,current_box = calculate_energy(box, current_order)
-                break
-            else:
-                current_energy = 0
-                current_box = None
+        # 只评估邻居状态，当前状态的能量和容器随状态一起保留
+        new_energy, new_box = evaluate(new_order)
 
+        accepted = True
         if new_energy > current_energy:
             current_energy = new_energy
             current_order = new_order.copy()
@@ -285,22 +446,26 @@ def simulated_annealing_pack(items, boxes, initial_temp=1000, cooling_rate=0.995
          # 计算接受新解的概率p，根据目标函数值的差异和当前温度T
         else:
             # 接受或拒绝邻居状态
-            if math.exp((current_energy - new_energy) / current_temp) > random.random():
+            if math.exp((current_energy - new_energy) / current_temp) > rng.random():
                 current_energy = new_energy
                 current_order = new_order.copy()
                 current_box = new_box
             else:
-                pass     # 接受失败，继续当前状态
+                accepted = False     # 接受失败，继续当前状态
 
         if current_energy > best_energy:
             best_energy = current_energy
             best_order = current_order.copy()
             smallest_box = current_box
+        if stats:
+            stats.count('iterations')
+            stats.record(current_temp, current_energy, best_energy, accepted)
         current_temp *= cooling_rate  # 温度衰减
 
     # 应用最佳布局方案
     if smallest_box:
-        layout_items(best_order, smallest_box)
+        layout_fn(best_order, smallest_box)
+        best_order = expand_blocks(best_order)
         used_volume = sum(i.volume for i in best_order)
         utilization = used_volume / smallest_box.volume * 100
         return smallest_box,best_order,used_volume, utilization  # 返回最优容器和利用率
@@ -308,53 +473,128 @@ def simulated_annealing_pack(items, boxes, initial_temp=1000, cooling_rate=0.995
         return None, None,0, 0  # 无可用容器直接返回
 
 
-if __name__=='__main__':
-    with open('box_inf.txt', 'r',encoding='utf-8') as f:
-        lines = f.readlines()
-
-    boxes = []
+def parse_order_spec(spec, sku_table, order_id):
+    """把一行订单 JSON 对象转换为物品列表 [(长, 宽, 高, 是否冷冻), ...]，格式错误时抛出 ValueError"""
+    if not isinstance(spec, dict) or not isinstance(spec.get('items'), list):
+        raise ValueError('订单应为包含 items 列表的 JSON 对象')
     items = []
-    for line in lines:
-        if line.strip()[3] == '纸':
-            inf = line.strip().split(',')
-            box = Box(inf[0].strip("'"),float(inf[1]),float(inf[2]),float(inf[3]),False)
+    for entry in spec['items']:
+        if isinstance(entry, dict):
+            if 'code' not in entry:
+                raise ValueError(f'物品 {entry} 缺少 code')
+            code = str(entry['code']).strip()
+            num = entry.get('num', 1)
+            if not isinstance(num, int) or isinstance(num, bool) or num < 0:
+                raise ValueError(f'物品 {code} 的数量 {num!r} 不是非负整数')
+            if code not in sku_table:
+                print(f"订单{order_id}物品{code}在商品尺寸表中不存在，已跳过", file=sys.stderr)
+                continue
+            items.extend([sku_table[code]] * num)
+        elif isinstance(entry, list) and len(entry) == 4:
+            *dims, is_frozen = entry
+            if not all(isinstance(d, (int, float)) and not isinstance(d, bool) and d > 0 for d in dims):
+                raise ValueError(f'物品 {entry} 的尺寸应为正数')
+            if not isinstance(is_frozen, bool):
+                raise ValueError(f'物品 {entry} 的冷冻标志应为 true / false')
+            items.append((*map(float, dims), is_frozen))
         else:
-            inf = line.strip().split(',')
-
-
-            box = Box(inf[0].strip("'"),float(inf[1]),float(inf[2]),float(inf[3]),True)
-
-        boxes.append(box)
-    my_chosen = input("要选择冷冻物品还是常温的呢？（冷冻：0/常温：1）：")
-    if my_chosen == '0':
-        chosen_samples = random.sample(range(len(cold_item)), random.randint(4, 9))
-        for i in chosen_samples:
-            item = Item(float(cold_item.iloc[i]['L']), float(cold_item.iloc[i]['W']), float(cold_item.iloc[i]['H']), True)
-            print(f"冷冻物品: {cold_item.iloc[i].to_string()}")
-            items.append(item)
-    elif my_chosen == '1':
-        chosen_samples = random.sample(range(len(common_item)), random.randint(4, 9))
-        for i in chosen_samples:
-            item = Item(float(common_item.iloc[i]['L']), float(common_item.iloc[i]['W']), float(common_item.iloc[i]['H']), False)
-            print(f"常规物品: {common_item.iloc[i].to_string()}")
-            items.append(item)
-    else:
-        print("输入错误")
-        exit()
-
-
-    history = []
-    items, boxes = preprocess_order(items, boxes)
-    for _ in range(10):
-        best_box,best_order,used_volume, utilization = simulated_annealing_pack(items, boxes)
-        history.append((best_box,best_order,used_volume, utilization))
-    history = sorted(history, key=lambda x: x[3], reverse=True)
-    best_box,best_order,used_volume, utilization = history[0]
-    if best_box:
-        print("=="*50)
-        print(f"最佳容器: {best_box.id},容器体积: {best_box.volume:.1f}cm^3,使用的体积: {used_volume:.1f}cm^3, 利用率: {utilization:.1f}%")
-        print("物品放置顺序:")
-        for i in best_order:
-            print(f"尺寸: {i.get_current_size()} 位置: {i.position}")
+            raise ValueError(f'物品 {entry!r} 应为 {{"code", "num"}} 或 [长, 宽, 高, 是否冷冻]')
+    return items
+
+
+def read_order_specs(lines, sku_table):
+    """
+    逐行读取 JSON Lines 订单，产出 (订单序号, [(长, 宽, 高, 是否冷冻), ...])
+    每行为 {"id": 订单序号, "items": [...]}，物品可以是 {"code": 商品编号, "num": 数量}，也可以直接给出 [长, 宽, 高, 是否冷冻]
+    （冷冻标志必须是 JSON 布尔值）；缺少 id 时按行号编号，商品尺寸表中不存在的编号跳过；
+    格式错误的行产出 (订单序号, ValueError)，由 run_orders 写为错误记录，不中断后续订单
+    """
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            spec = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f'第 {line_no} 行不是合法的 JSON: {e}')
+            continue
+        order_id = spec.get('id', line_no) if isinstance(spec, dict) else line_no
+        try:
+            yield order_id, parse_order_spec(spec, sku_table, order_id)
+        except ValueError as e:
+            yield order_id, e
+
+
+def run_orders(orders, boxes, restarts=10, workers=None, master_seed=0, chunk_size=64, output=sys.stdout):
+    """
+    批量退火：每 chunk_size 个订单并行退火一次，每个订单的结果立即写为一行 JSON（格式同 pack_cache 的缓存条目，附加 id 和物品数）
+    orders: 可迭代的 (订单序号, [(长, 宽, 高, 是否冷冻), ...])，物品列表位置为异常对象时写出 {"id": ..., "error": ...}
+    返回 (订单数, 错误记录数, 有解订单数, 利用率之和)，订单数包含错误记录
+    """
+    orders = iter(orders)
+    count, errors, solved, total_utilization = 0, 0, 0, 0
+    while True:
+        chunk = list(itertools.islice(orders, chunk_size))
+        if not chunk:
+            break
+        # 同一批中订单序号可能重复（如来自多个文件），内部按批内序号区分
+        prepared = {k: preprocess_order([Item(*dims) for dims in items], boxes)
+                    for k, (_, items) in enumerate(chunk) if items and not isinstance(items, Exception)}
+        results = parallel_pack(prepared, simulated_annealing_pack, restarts, workers, master_seed + count)
+        for k, (order_id, items) in enumerate(chunk):
+            count += 1
+            if isinstance(items, Exception):
+                output.write(json.dumps({'id': order_id, 'error': str(items)}, ensure_ascii=False) + '\n')
+                errors += 1
+                continue
+            record = {'id': order_id, 'items': len(items)}
+            record.update(encode_result(results[k] if k in results else (None, None, 0, 0)))
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            solved += record['box'] is not None
+            total_utilization += record['utilization']
+        output.flush()
+    return count, errors, solved, total_utilization
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='模拟退火装箱批量入口：结果逐订单输出为 JSON Lines')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--orders', help='JSON Lines 订单文件，- 表示从标准输入读取')
+    source.add_argument('--generate', type=int, help='按商品尺寸表随机生成的订单数')
+    parser.add_argument('--size', type=int, default=6, help='生成订单的物品数')
+    parser.add_argument('--frozen-ratio', type=float, default=0.3, help='生成订单中冷冻订单的比例')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.3, help='生成订单中重复商品的概率')
+    parser.add_argument('--skus', default='附件2-商品尺寸.xlsx', help='商品尺寸文件（xlsx / csv）')
+    parser.add_argument('--boxes', default='box_inf.txt', help='包装箱信息文件（txt / docx）')
+    parser.add_argument('--restarts', type=int, default=10, help='每个订单的退火重启次数')
+    parser.add_argument('--workers', type=int, help='进程数，默认使用全部 CPU 核心')
+    parser.add_argument('--seed', type=int, default=0, help='主随机种子（同时用于生成订单）')
+    parser.add_argument('--chunk-size', type=int, default=64, help='每批并行退火的订单数')
+    parser.add_argument('--output', help='结果 JSON Lines 文件，默认写到标准输出')
+    args = parser.parse_args()
+
+    sku_table = load_sku_table(args.skus)
+    boxes = [Box(*spec) for spec in load_catalogue(args.boxes).specs()]
+    if args.generate is not None:
+        from bench_solvers import synthetic_orders
+        orders = synthetic_orders(sku_table, args.generate, args.size, args.frozen_ratio, args.duplicate_ratio, args.seed)
+        f = None
     else:
-        print("无可行解")
+        f = sys.stdin if args.orders == '-' else open(args.orders, 'r', encoding='utf-8')
+        orders = read_order_specs(f, sku_table)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        count, errors, solved, total_utilization = run_orders(orders, boxes, args.restarts, args.workers, args.seed,
+                                                      args.chunk_size, output)
+    finally:
+        if f and f is not sys.stdin:
+            f.close()
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+    # 汇总写到标准错误，标准输出只包含逐订单结果；平均利用率只按成功解析的订单计算，不计错误记录
+    parsed = count - errors
+    print(f"订单 {count} 个, 错误 {errors} 个, 有解 {solved} 个, "
+          f"平均利用率 {total_utilization / parsed if parsed else 0:.1f}%, "
+          f"耗时 {elapsed:.2f}s, {count / elapsed if elapsed else 0:.2f} 订单/秒", file=sys.stderr)
@@ -1,12 +1,17 @@
+import csv
 import itertools
+from functools import lru_cache, partial
 import math
 import random
-import pandas as pd
+import time
 import numpy as np
-
-data_2 = pd.read_excel('附件2-商品尺寸.xlsx')
-data_3 = pd.read_excel('附件3-订单信息.xlsx')
-data_2 = data_2.drop_duplicates()
+from pack_cache import PackCache, decode_result, encode_result, order_signature
+from box_catalogue import load_catalogue
+from box_screen import screen_boxes
+from energy_model import EnergyModel
+from order_stream import iter_orders, load_sku_table
+from sku_catalogue import SkuCatalogue
+from parallel_pack import parallel_pack
 
 
 """
@@ -14,19 +19,22 @@ data_2 = data_2.drop_duplicates()
 核心功能：通过模拟退火算法优化物品装箱顺序和方向，提高容器空间利用率
 """
 
-# 读取数据
-# 预处理原始数据，分离常温/冷冻物品
-common_item = data_2[data_2['TL'] == '常温']  # 从原始数据筛选常温物品
-cold_item = data_2[data_2['TL'] == '冷冻']    # 从原始数据筛选冷冻物品
+ENERGY_WEIGHTS = (0.7, 0.3)  # 能量函数中体积利用率和紧凑度的权重
+ICE_DIMS, ICE_COUNT = (15, 11, 2.5), 2  # 冷冻订单附带的冰块尺寸和数量
 
 class Item:
     """物品类，封装物品属性和放置信息"""
-    def __init__(self, l, w, h, is_frozen):
+    __slots__ = ('dims', 'is_frozen', 'volume', 'orientation', 'position', 'orientations', 'sku')
+
+    def __init__(self, l, w, h, is_frozen, sku=None, orientations=None):
         self.dims = (l, w, h)       # 物品原始尺寸（长宽高）
         self.is_frozen = is_frozen  # 是否冷冻物品标志
         self.volume = l * w * h     # 计算物品体积
         self.orientation = (l,w,h)   # 当前放置方向（尺寸排列组合）
         self.position = (0, 0, 0)     # 在容器中的坐标(x,y,z)
+        self.sku = sku              # 在 SkuCatalogue 中的行号（不是目录中的商品时为 None）
+        # 全部不重复的摆放方向，已按底面积降序、高度升序排列（目录商品直接引用目录中的方向表）
+        self.orientations = orientations or sorted_orientations(self.dims)
 
     def get_current_size(self):
         """获取物品当前方向的实际尺寸"""
@@ -34,32 +42,88 @@ class Item:
 
 class Box:
     """容器类，描述装箱容器属性及装载状态"""
+    __slots__ = ('id', 'dims', 'volume', 'is_used_for_frozen', 'used_space', 'checkpoints')
+
     def __init__(self, id, l, w, h, is_used_for_frozen):
         self.id = id                # 容器唯一标识
         self.dims = (l, w, h)       # 容器尺寸（长宽高）
         self.volume = l * w * h     # 容器总容积
         self.is_used_for_frozen = is_used_for_frozen  # 是否冷冻专用容器
-        self.used_space = []        # 已装载物品信息列表
+        self.used_space = []        # 已装载物品信息列表，每项为 (位置, 放置尺寸, 物品)
+        self.checkpoints = []       # 布局检查点：[碎片体积下限, (物品, 空闲空间, 放置记录), ...]
 
-def preprocess_order(items, boxes):
-    """订单预处理逻辑：冷冻订单添加冰块并过滤容器"""
-    if items[0].is_frozen:
-        # 添加两个标准尺寸的冰块（15*11*2.5cm）
-        items += [Item(15, 11, 2.5, True) for _ in range(2)]
-        # 筛选适合冷冻物品的容器
-        boxes = [b for b in boxes if b.is_used_for_frozen]
-    else:
-        # 筛选非冷冻容器
-        boxes = [b for b in boxes if not b.is_used_for_frozen]
-    return items, boxes
+class BoxPools:
+    """按温层预先分好的容器池：启动时构建一次，各订单共享；每个池按体积升序排列，并附带体积数组用于二分查找"""
+    def __init__(self, boxes):
+        self.pools = {}
+        for frozen in (True, False):
+            pool = sorted((b for b in boxes if b.is_used_for_frozen == frozen), key=lambda b: b.volume)
+            self.pools[frozen] = (pool, np.array([b.volume for b in pool], dtype=float))
 
+    def select(self, is_frozen, min_volume=0):
+        """温层匹配且容积不小于 min_volume 的容器，按体积升序返回新列表"""
+        pool, volumes = self.pools[is_frozen]
+        return pool[int(np.searchsorted(volumes, min_volume - 1e-9)):]
 
-# 相邻空间合并策略
-def merge_space(free_regions):
-    pass
 
-def block_merge(items):
-    pass
+def preprocess_order(items, boxes):
+    """
+    订单预处理逻辑：冷冻订单添加冰块并过滤容器，返回新的 (物品列表, 容器列表)，不修改传入的物品列表和容器
+    boxes: BoxPools 或容器列表（传入列表时临时构建容器池，批量处理时应预先构建一次）；
+    返回的容器按体积升序排列，并已排除容积小于物品总体积的容器
+    """
+    if not isinstance(boxes, BoxPools):
+        boxes = BoxPools(boxes)
+    is_frozen = items[0].is_frozen
+    items = list(items)
+    if is_frozen:
+        # 添加两个标准尺寸的冰块（15*11*2.5cm），冰块记录每个订单的放置状态，需要每个订单单独创建
+        items += [Item(*ICE_DIMS, True) for _ in range(ICE_COUNT)]
+    return items, boxes.select(is_frozen, sum(i.volume for i in items))
+
+
+class Block(Item):
+    """物品块：多件相同物品沿最短边叠放成的整体，布局时作为一件物品放置"""
+    __slots__ = ('members', 'thickness')
+
+    def __init__(self, members):
+        s0, s1, s2 = sorted(members[0].dims)
+        super().__init__(s2, s1, s0 * len(members), members[0].is_frozen)
+        self.members = members   # 组成物品块的单件物品
+        self.thickness = s0      # 单件物品在叠放方向上的厚度
+
+    def place_members(self):
+        """根据物品块的位置和方向，计算每件成员物品的位置和方向"""
+        axis = self.orientation.index(self.dims[2])  # 叠放方向所在的坐标轴
+        for k, member in enumerate(self.members):
+            position = list(self.position)
+            position[axis] += k * self.thickness
+            orientation = list(self.orientation)
+            orientation[axis] = self.thickness
+            member.position = tuple(position)
+            member.orientation = tuple(orientation)
+
+
+def block_merge(items, max_count=4):
+    """把相同尺寸的物品每 max_count 件合并成一个物品块，返回新的待装物品列表（保持首次出现的顺序）"""
+    groups = {}
+    for item in items:
+        groups.setdefault((tuple(sorted(item.dims)), item.is_frozen), []).append(item)
+
+    units = []
+    for group in groups.values():
+        for start in range(0, len(group), max_count):
+            members = group[start:start + max_count]
+            units.append(Block(members) if len(members) > 1 else members[0])
+    return units
+
+
+def expand_blocks(units):
+    """把物品块展开为单件物品"""
+    items = []
+    for unit in units:
+        items.extend(getattr(unit, 'members', (unit,)))
+    return items
 
 
 def check_overlap(pos1, dims1, pos2, dims2):
@@ -74,121 +138,200 @@ def check_overlap(pos1, dims1, pos2, dims2):
     return x_overlap and y_overlap and z_overlap
 
 
-def layout_items(items, box):
-    """核心装箱布局算法（带空间分割策略）"""
+@lru_cache(maxsize=None)
+def sorted_orientations(dims):
+    """物品不重复的摆放方向，按底面积降序、高度升序排列（相同尺寸只计算一次，与 SkuCatalogue 的方向表一致）"""
+    orientations = sorted(itertools.permutations(dims), key=lambda d: (-d[0] * d[1], d[2]))
+    return tuple(o for k, o in enumerate(orientations) if o not in orientations[:k])
+
+
+def contains(outer, inner, eps=1e-9):
+    """判断空间 outer 是否完全包含空间 inner（空间为 (位置, 尺寸) 元组，允许浮点误差 eps）"""
+    (o_pos, o_dims), (i_pos, i_dims) = outer, inner
+    for a in range(3):
+        if i_pos[a] < o_pos[a] - eps:
+            return False
+        if i_pos[a] + i_dims[a] > o_pos[a] + o_dims[a] + eps:
+            return False
+    return True
+
+
+def fragment_bounds(items):
+    """过滤碎片空间的下限 (最小单件物品的体积, 最小单件物品的最短边)：体积或任一边小于下限的空间放不下任何物品"""
+    singles = expand_blocks(items)
+    return min(i.volume for i in singles), min(min(i.dims) for i in singles)
+
+
+def split_space(free_regions, pos, dims, bounds):
+    """
+    按新放置的物品切分与其相交的空闲空间，返回 (未受影响的空间, 切分出的新空间)
+    每个相交的空间在物品的 6 个面外侧各切出一个子空间，子空间在另外两个方向上保持原空间的全部尺寸
+    bounds: fragment_bounds 给出的 (体积下限, 边长下限)，放不下任何物品的子空间直接丢弃
+    """
+    min_volume, min_side = bounds
+    untouched, pieces = [], []
+    for region in free_regions:
+        r_pos, r_dims = region
+        if not check_overlap(r_pos, r_dims, pos, dims):
+            untouched.append(region)
+            continue
+        for a in range(3):
+            # 物品在该方向负侧的剩余空间
+            if pos[a] > r_pos[a]:
+                new_dims = list(r_dims)
+                new_dims[a] = pos[a] - r_pos[a]
+                pieces.append((r_pos, tuple(new_dims)))
+            # 物品在该方向正侧的剩余空间
+            end, r_end = pos[a] + dims[a], r_pos[a] + r_dims[a]
+            if r_end > end:
+                new_pos, new_dims = list(r_pos), list(r_dims)
+                new_pos[a], new_dims[a] = end, r_end - end
+                pieces.append((tuple(new_pos), tuple(new_dims)))
+
+    # 过滤掉太小或太薄的空间，避免碎片化（这些空间放不下任何物品，删除后布局结果不变）
+    pieces = [r for r in pieces if r[1][0] * r[1][1] * r[1][2] >= min_volume and min(r[1]) >= min_side]
+    return untouched, pieces
+
+
+def merge_space(free_regions, new_regions, eps=1e-9):
+    """
+    维护最大空闲空间列表：被其他空间包含的空间直接删除
+    切分出的子空间都是各自方向上的最大空间，相邻空间之间本身已相互覆盖，不需要再拼接
+    free_regions 为 split_space 返回的未受影响空间，它们之间互不包含；新空间位于被切分的原空间之内，
+    不可能包含未受影响的空间，所以只在新空间之间删除被包含的空间，结果与逐个比较全部空间相同
+    """
+    # 预先算好各空间放宽 eps 后的边界 (x0, y0, z0, x1, y1, z1)，判断新空间是否被包含时不再逐对调用 contains
+    outer = [(x - eps, y - eps, z - eps, x + w + eps, y + h + eps, z + d + eps)
+             for (x, y, z), (w, h, d) in free_regions]
+    accepted, accepted_outer = [], []
+    for new in new_regions:
+        (x, y, z), (w, h, d) = new
+        x1, y1, z1 = x + w, y + h, z + d
+        if any(x >= b[0] and y >= b[1] and z >= b[2] and x1 <= b[3] and y1 <= b[4] and z1 <= b[5]
+               for b in itertools.chain(outer, accepted_outer)):
+            continue
+        kept = [k for k, r in enumerate(accepted) if not contains(new, r, eps)]
+        accepted = [accepted[k] for k in kept] + [new]
+        accepted_outer = [accepted_outer[k] for k in kept] + [(x - eps, y - eps, z - eps, x1 + eps, y1 + eps, z1 + eps)]
+    return free_regions + accepted
+
+
+def restore_checkpoint(items, box, bounds):
+    """
+    从容器上一次布局的检查点恢复：找出本次物品顺序与上次布局相同的最长前缀，
+    恢复前缀放置完成后的空闲空间和放置记录，返回 (继续放置的起始下标, 空闲空间列表)
+    bounds: 碎片空间下限，与上次布局不同时检查点全部失效
+    """
+    checkpoints = box.checkpoints
+    if not checkpoints or checkpoints[0] != bounds:
+        box.checkpoints = [bounds]
+        return 0, [((0,0,0), box.dims)]
+    start = 0
+    limit = min(len(items), len(checkpoints) - 1)
+    while start < limit and checkpoints[start + 1][0] is items[start]:
+        start += 1
+    del checkpoints[start + 1:]
+    if not start:
+        return 0, [((0,0,0), box.dims)]
+
+    # 物品对象可能已被其他布局移动，按检查点中的放置记录恢复前缀物品的位置和方向
+    for _, _, placements in checkpoints[1:]:
+        for pos, dim, item in placements:
+            box.used_space.append((pos, dim, item))
+            item.position = pos
+            item.orientation = dim
+            if isinstance(item, Block):
+                item.place_members()
+    return start, list(checkpoints[start][1])
+
+
+def layout_items(items, box, energy=None, stats=None, bounds=None):
+    """
+    核心装箱布局算法（最大空闲空间策略），物品块放不下时拆成单件继续放置
+    每放完一个物品（块）在 box.checkpoints 中记录一次空闲空间和放置记录，
+    下次布局时与上次顺序相同的前缀直接从检查点恢复，只重新放置变化之后的物品
+    energy: 该容器的 EnergyModel，布局时同步回退和加入放置记录
+    stats: PackStats，统计布局次数、复用的前缀、扫描的空间数和空间数峰值等
+    bounds: 过滤碎片空间的 (体积下限, 边长下限)，默认为 fragment_bounds(items)；检查点只在下限相同时复用，
+    物品逐件增加的调用方应传入对全部候选物品固定的下限
+    """
     box.used_space = []  # 重置容器装载状态
-    # 初始化可用区域列表，起始为整个容器空间
-    free_regions = [{'pos': (0,0,0), 'dims': box.dims}]
-
-    for item in items:  # 遍历所有待装物品
-        placed = False  # 物品放置状态标记
-        # 按空间利用率和最大尺寸排序可用区域（优先选择大且紧凑的空间）
-        free_regions.sort(key=lambda r: (r['dims'][0]*r['dims'][1]*r['dims'][2],  # 区域体积降序
-            -max(r['dims'])  # 最大尺寸升序（优先较小最大尺寸）优先选择最大尺寸较小的区域，因为较小的最大尺寸意味着区域更紧凑，更有可能成功放置物品。
-        ))
-
-        # 遍历所有可用区域尝试放置
-        for i, region in enumerate(free_regions):
-            r_pos = region['pos']  # 区域起始坐标
-            r_dims = region['dims']  # 区域尺寸
-
-
-            # 生成物品所有可能方向，并按底面积和高度排序（优先大底面积方向）
-            for dim in sorted(itertools.permutations(item.dims),
-                              key=lambda d: (-d[0] * d[1], d[2])):  # 优先选择底面积大的方向
-                # 检查当前方向是否适合当前区域
-                # 检查是否与已放置的物品重叠
-                overlap = False
-                for used_item in box.used_space:
-                    if check_overlap(r_pos, dim, used_item['pos'], used_item['dims']):
-                        overlap = True
+    if not items:
+        return True
+    if bounds is None:
+        bounds = fragment_bounds(items)
+    # 空闲空间列表，每项为 (位置, 尺寸)，没有可用检查点时为整个容器空间
+    start, free_regions = restore_checkpoint(items, box, bounds)
+    if energy:
+        energy.rollback(len(box.used_space))
+    if stats:
+        stats.count('layouts')
+        stats.count('resumed_units', start)
+
+    for unit in items[start:]:
+        placed_from = len(box.used_space)
+        pending = [unit]  # 待放置物品栈，物品块拆开后成员物品压回栈顶
+        while pending:
+            item = pending.pop()
+            placed = False  # 物品放置状态标记
+            # 按空间利用率和最大尺寸排序可用区域（优先选择大且紧凑的空间）
+            free_regions.sort(key=lambda r: (r[1][0]*r[1][1]*r[1][2],  # 区域体积降序
+                -max(r[1])  # 最大尺寸升序（优先较小最大尺寸）优先选择最大尺寸较小的区域，因为较小的最大尺寸意味着区域更紧凑，更有可能成功放置物品。
+            ))
+
+            # 物品所有可能方向，已按底面积和高度排序（优先大底面积方向）
+            orientations = item.orientations
+            # 遍历所有可用区域尝试放置
+            for r_pos, r_dims in free_regions:  # 区域起始坐标和尺寸
+                for dim in orientations:
+                    # 空闲空间内没有已放置的物品，只需检查尺寸是否合适
+                    if all(d <= rd for d, rd in zip(dim, r_dims)):
+                        placed = True
                         break
-
-                if overlap:
-                    continue
-
-                if all(d <= rd for d, rd in zip(dim, r_dims)):
-                    # 记录物品放置信息
-                    new_pos = (
-                        r_pos[0],
-                        r_pos[1],
-                        r_pos[2]
-                    )
-
-
-                    item.position = new_pos
-                    item.orientation = dim
-
-                    box.used_space.append({
-                        'pos': new_pos,
-                        'dims': dim,
-                        'item': item
-                    })
-
-                    # 空间分割处理
-                    new_regions = []
-
-                                        # X方向剩余空间
-                    if r_dims[0] - dim[0] > 0:
-                        new_regions.append({
-                            'pos': (r_pos[0] + dim[0], r_pos[1], r_pos[2]),
-                            'dims': (r_dims[0] - dim[0], r_dims[1], r_dims[2])
-                        })
-
-                    # Y方向剩余空间
-                    if r_dims[1] - dim[1] > 0:
-                        new_regions.append({
-                            'pos': (r_pos[0], r_pos[1] + dim[1], r_pos[2]),
-                            'dims': (r_dims[0], r_dims[1] - dim[1], r_dims[2])
-                        })
-
-                    # Z方向剩余空间
-                    if r_dims[2] - dim[2] > 0:
-                        new_regions.append({
-                            'pos': (r_pos[0], r_pos[1], r_pos[2] + dim[2]),
-                            'dims': (r_dims[0], r_dims[1], r_dims[2] - dim[2])
-                        })
-
-
-                    # 更新可用区域列表
-                    del free_regions[i]
-                    # 过滤掉太小的区域，避免碎片化
-                    min_volume = min(i.volume for i in items)
-                    new_regions = [r for r in new_regions
-                                   if r['dims'][0] * r['dims'][1] * r['dims'][2] >= min_volume]
-                    free_regions.extend(new_regions)
-
-                    placed = True
+                if placed:
                     break
-
-            if placed:
-                break
-
-        if not placed:
-            box.used_space = []  # 重置容器装载状态
-            return False  # 放置失败终止装箱
+            if stats:
+                stats.count('placements_tried')
+                stats.peak('max_free_regions', len(free_regions))
+
+            if not placed:
+                if isinstance(item, Block):
+                    if stats:
+                        stats.count('block_splits')
+                    pending.extend(reversed(item.members))  # 物品块放不下，拆成单件逐个放置
+                    continue
+                box.used_space = []  # 重置容器装载状态
+                if stats:
+                    stats.count('layout_failures')
+                return False  # 放置失败终止装箱
+
+            # 记录物品放置信息
+            item.position = r_pos
+            item.orientation = dim
+            if isinstance(item, Block):
+                item.place_members()
+            box.used_space.append((r_pos, dim, item))
+            if energy:
+                energy.push(r_pos, dim)
+
+            # 按新放置的物品切分空闲空间，并删除被包含的空间
+            if stats:
+                stats.count('overlap_checks', len(free_regions))
+            free_regions, new_regions = split_space(free_regions, r_pos, dim, bounds)
+            free_regions = merge_space(free_regions, new_regions)
+
+        # 记录检查点：该物品（块）放置完成后的空闲空间和新增的放置记录
+        box.checkpoints.append((unit, tuple(free_regions), tuple(box.used_space[placed_from:])))
 
     return True  # 所有物品成功放置
 
 
-def calculate_energy(box, items):
-    """计算布局能量值（目标函数）"""
-    used_volume = sum(i.volume for i in items)  # 已使用体积
-    total_volume = box.volume  # 容器总容积
-
-
-    # 紧凑度惩罚项（计算X，Y，Z轴方向最大延伸长度占比）
-    max_coord_x = max(
-        i.position[0] + i.orientation[0] for i in items
-    ) if items else 0
-    max_coord_y = max(
-        i.position[1] + i.orientation[1] for i in items
-    ) if items else 0
-    max_coord_z = max(
-        i.position[2] + i.orientation[2] for i in items
-    ) if items else 0
-
-    dim_fill_rate = max_coord_x / box.dims[0]* max_coord_y / box.dims[1]* max_coord_z / box.dims[2]
+def calculate_energy(box, items, weights=ENERGY_WEIGHTS):
+    """计算布局能量值（目标函数），按容器的全部放置记录重新计算；退火过程中由 EnergyModel 增量维护"""
+    # 体积项 + 紧凑度项（X，Y，Z轴方向最大延伸长度占比），按实际放置记录计算，物品块拆开时同样适用
+    energy = EnergyModel(box, items, *weights)
+    for pos, dims, _ in box.used_space:
+        energy.push(pos, dims)
     # # 高度差惩罚项（计算物品高度差）
     # # 除了计算X，Y，Z轴方向最大延伸长度占比，还应该计算并选择能够最大程度减小高度差的放置方案，使得物品尽可能紧凑。
     # z_positions = [i.position[2]+i.orientation[2] for i in items]
@@ -203,7 +346,7 @@ def calculate_energy(box, items):
     # z_positions_std_normalized = z_positions_std / range_z_positions if range_z_positions > 0 else 0
 
     # 综合能量计算
-    return (used_volume / total_volume) * 0.7  + dim_fill_rate * 0.3, box
+    return energy.energy(), box
 
 
 
@@ -215,43 +358,93 @@ def block_exchange(new_order, start, length, target):
     return new_order
 
 
-def neighbor_generator(current_order, mutation_rate=0.5):
-    """邻居状态生成器（混合变异策略）"""
+def neighbor_generator(current_order, mutation_rate=0.5, rng=random):
+    """邻居状态生成器（混合变异策略），rng 为随机数生成器（random.Random 实例，默认使用全局 random 模块）"""
     new_order = current_order.copy()  # 复制当前状态
+    if len(new_order) < 2:
+        return new_order  # 单件订单没有可交换的位置
 
-    if random.random() < mutation_rate:
+    if rng.random() < mutation_rate:
         # 单点变异：交换两个随机物品位置
-        i, j = random.sample(range(len(new_order)), 2)
+        i, j = rng.sample(range(len(new_order)), 2)
         new_order[i], new_order[j] = new_order[j], new_order[i]
     else:
         # 块变异：交换连续物品段（增强局部搜索能力）
-        start = random.randint(0, len(new_order)-2)  # 随机起始位置
-        length = random.randint(1, min(3, len(new_order)-start))  # 块长度1-3
+        start = rng.randint(0, len(new_order)-2)  # 随机起始位置
+        length = rng.randint(1, min(3, len(new_order)-start))  # 块长度1-3
         # 随机目标位置
-        target = random.randint(0, len(new_order)-length)
+        target = rng.randint(0, len(new_order)-length)
         # 执行块交换
         new_order = block_exchange(new_order, start, length, target)
 
 
     return new_order
 
-def simulated_annealing_pack(items, boxes, initial_temp=1000, cooling_rate=0.995, final_temp=1):
-    """模拟退火主算法"""
+def simulated_annealing_pack(items, boxes, initial_temp=1000, cooling_rate=0.995, final_temp=1, layout_fn=layout_items,
+                             energy_weights=ENERGY_WEIGHTS, initial_order=None, deadline=None,
+                             rng=random, stats=None):
+    """
+    模拟退火主算法，layout_fn 为布局实现（layout_items 或 layout_numpy.layout_items_np）
+    energy_weights: 能量函数中 (体积利用率, 紧凑度) 的权重
+    initial_order: 初始放置顺序（如极点法贪心 box.placed_items 对应的物品顺序），为 None 时按体积降序
+    deadline: 截止时刻（time.perf_counter() 的取值），到达后停止降温并返回目前最好的结果
+    rng: 随机数生成器，传入由种子创建的 random.Random 实例时结果可复现（默认使用全局 random 模块）
+    stats: PackStats，统计迭代次数、布局缓存命中、被排除的容器和各步的能量与接受情况
+    """
     for i in items:
         i.position = (0, 0, 0)  # 重置物品位置信息
         i.orientation = (i.dims[0], i.dims[1], i.dims[2])
-    # 选择最小可用容器（体积刚好满足物品总体积）
-    boxes = sorted([b for b in boxes if b.volume >= sum(i.volume for i in items)],key=lambda x: x.volume)
+    # 预筛选可能装下全部物品的容器（尺寸支配关系 + 体积和装箱下界），按体积从小到大排列
+    candidates = boxes
+    boxes = screen_boxes((i.dims for i in items), boxes)
+    if stats:
+        stats.count('boxes_screened_out', len(candidates) - len(boxes))
     if not boxes:
         return None, None,0, 0  # 无可用容器直接返回
-    # 初始化状态：按体积和最大尺寸降序排列
-    current_order = sorted(items, key=lambda x: (-x.volume, -max(x.dims)))
+    # 初始化状态：给定初始顺序时从该顺序开始，否则按体积和最大尺寸降序排列
+    # 相同物品合并为物品块，减少需要排列和逐个放置的单元数
+    if initial_order:
+        current_order = block_merge(initial_order)
+    else:
+        current_order = sorted(block_merge(items), key=lambda x: (-x.volume, -max(x.dims)))
     best_order = current_order.copy()  # 记录最佳状态
-    best_energy = 0  # 最佳能量值
     current_temp = initial_temp  # 初始化温度
-    smallest_box = boxes[-1]  # 选择最小可用容器
+
+    # 布局缓存：能量只取决于物品（块）尺寸的排列顺序，相同排列不再重复布局
+    layout_memo = {}
+    # 每个容器一个能量模型，与容器上的布局检查点同步回退
+    energies = {}
+    for box in boxes:
+        box.checkpoints = []
+        energies[box.id] = EnergyModel(box, items, *energy_weights)
+
+    def evaluate(order):
+        """返回排列 order 的 (能量, 容器)，依次尝试从小到大的容器"""
+        key = tuple((i.dims, len(getattr(i, 'members', ()))) for i in order)
+        if key not in layout_memo:
+            if stats:
+                start = time.perf_counter()
+            result = (0, boxes[-1])
+            for box in boxes:
+                if layout_fn(order, box, energies[box.id], stats):
+                    result = (energies[box.id].energy(), box)
+                    break
+                if stats:
+                    stats.count('boxes_rejected')
+            layout_memo[key] = result
+            if stats:
+                stats.add_time('layout', time.perf_counter() - start)
+        elif stats:
+            stats.count('memo_hits')
+        return layout_memo[key]
+
+    current_energy, current_box = evaluate(current_order)
+    # 初始状态也是候选结果：截止时刻在第一轮之前就已到达时按初始状态返回
+    best_energy, smallest_box = current_energy, current_box  # 最佳能量值和最小可用容器
     # 退火循环
     while current_temp > final_temp:
+        if deadline is not None and time.perf_counter() > deadline:
+            break  # 时间用完，按目前最好的状态返回
         # 生成邻居状态
         if current_temp > 500:
             cooling_rate = 0.97
@@ -261,30 +454,15 @@ def simulated_annealing_pack(items, boxes, initial_temp=1000, cooling_rate=0.995
             cooling_rate = 0.999
 
 
-        if random.random()*current_temp >0.5:
-            new_order = neighbor_generator(current_order)
+        if rng.random()*current_temp >0.5:
+            new_order = neighbor_generator(current_order, rng=rng)
         else:
             new_order = current_order.copy()
 
-        # 尝试新布局并计算能量
-        for box in boxes:
-            success = layout_items(new_order, box)
-            if success:
-                new_energy,new_box = calculate_energy(box, new_order)
-                break
-            else:
-                new_energy = 0
-                new_box = boxes[-1]
-
-        for box in boxes:
-            success = layout_items(current_order, box)
-            if success:
-                current_energy,current_box = calculate_energy(box, current_order)
-                break
-            else:
-                current_energy = 0
-                current_box = boxes[-1]
+        # 只评估邻居状态，当前状态的能量和容器随状态一起保留
+        new_energy, new_box = evaluate(new_order)
 
+        accepted = True
         if new_energy > current_energy:
             current_energy = new_energy
             current_order = new_order.copy()
@@ -293,76 +471,202 @@ def simulated_annealing_pack(items, boxes, initial_temp=1000, cooling_rate=0.995
          # 计算接受新解的概率p，根据目标函数值的差异和当前温度T
         else:
             # 接受或拒绝邻居状态
-            if math.exp((current_energy - new_energy) / current_temp) > random.random():
+            if math.exp((current_energy - new_energy) / current_temp) > rng.random():
                 current_energy = new_energy
                 current_order = new_order.copy()
                 current_box = new_box
             else:
-                pass     # 接受失败，继续当前状态
+                accepted = False     # 接受失败，继续当前状态
 
         if current_energy > best_energy:
             best_energy = current_energy
             best_order = current_order.copy()
             smallest_box = current_box
+        if stats:
+            stats.count('iterations')
+            stats.record(current_temp, current_energy, best_energy, accepted)
         current_temp *= cooling_rate  # 温度衰减
 
-    # 应用最佳布局方案
-    layout_items(best_order, smallest_box)
+    # 应用最佳布局方案；最终布局失败说明没有任何容器能装下全部物品
+    if not layout_fn(best_order, smallest_box):
+        return None, None, 0, 0
+    best_order = expand_blocks(best_order)
     used_volume = sum(i.volume for i in best_order)
     utilization = used_volume / smallest_box.volume * 100
     return smallest_box,best_order,used_volume, utilization  # 返回最优容器和利用率
 
 
 
-if __name__=='__main__':
-    with open('box_inf.txt', 'r',encoding='utf-8') as f:
-        lines = f.readlines()
+def load_boxes(path='box_inf.txt'):
+    """读取包装箱信息文件（txt / docx，经 box_catalogue 编译缓存），返回容器列表"""
+    return [Box(*spec) for spec in load_catalogue(path).specs()]
 
-    boxes = []
 
-    for line in lines:
-        if line.strip()[3] == '纸':
-            inf = line.strip().split(',')
-            box = Box(inf[0].strip("'"),float(inf[1]),float(inf[2]),float(inf[3]),False)
+def split_order(items, boxes, deadline=None, max_boxes=None):
+    """
+    单个容器装不下时把订单拆到多个容器，返回 (各箱结果列表, 未能装箱的物品)，各箱结果为 (容器, 放置顺序, 使用体积, 利用率)
+    1. 物品按体积降序首次适应（first-fit decreasing）：依次尝试已开的箱子，layout_items 从检查点增量放入新物品
+       （碎片空间下限固定为整个订单的 fragment_bounds，检查点在各次尝试之间保持有效），都放不下时开新箱，
+       新箱使用能装下该物品的容器中体积最大的一个（体积最大的容器不一定在每个方向上都最大，如 5#纸箱比 6#纸箱长）
+    2. 分配完成后把每箱换成能装下该箱物品的最小容器
+    items 应已经过 preprocess_order 处理，boxes 为温层匹配的全部容器（BoxPools.select(is_frozen)，
+    不按订单总体积过滤，拆分后的单箱可以使用更小的容器）；超过 deadline（time.perf_counter() 的时刻）或开箱数达到 max_boxes 后，
+    剩余物品和单件就放不进任何容器的物品都计入未装箱物品
+    """
+    boxes = sorted(boxes, key=lambda b: b.volume)
+    if not boxes:
+        return [], list(items)
+    bounds = fragment_bounds(items) if items else (0, 0)
+    bins, leftovers = [], []  # bins 每项为 (容器, 物品列表)
+    for item in sorted(items, key=lambda x: (-x.volume, -max(x.dims))):
+        fitting = [] if deadline is not None and time.perf_counter() > deadline else screen_boxes([item.dims], boxes)
+        if not fitting:
+            leftovers.append(item)
+            continue
+        for box, packed in bins:
+            if layout_items(packed + [item], box, bounds=bounds):
+                packed.append(item)
+                break
         else:
-            inf = line.strip().split(',')
-            box = Box(inf[0].strip("'"),float(inf[1]),float(inf[2]),float(inf[3]),True)
-
-        boxes.append(box)
-    for order in range(5):
-        items = []
-        print('***'*50)
-        order_data = data_3[data_3['订单序号'] == order+1]
-        order_inf_dict = {}
-        for index, row in order_data.iterrows():
-            item_code = row['Item_Code']
-            num = row['Num']
-            order_inf_dict[item_code] = order_inf_dict.get(item_code, 0) + num
-        for index, row in data_2.iterrows():
-            if row['Item_Code'] in order_inf_dict.keys():
-                item_code = row['Item_Code']
-                num = order_inf_dict[item_code]
-
-                print(f"订单{order+1}物品{item_code}数量: {num},尺寸: {row['L']}x{row['W']}x{row['H']}")
-
-                for _ in range(num):
-                    item = Item(float(row['L']), float(row['W']), float(row['H']),False if row['TL']=='常温' else True)
-                    items.append(item)
-        print(f"订单{order+1}物品数量: {len(items)}")
-
-
-        history = []
-        items, boxes = preprocess_order(items, boxes)
-        for _ in range(10):
-            best_box,best_order,used_volume, utilization = simulated_annealing_pack(items, boxes)
-            history.append((best_box,best_order,used_volume, utilization))
-        history = sorted(history, key=lambda x: x[3], reverse=True)
-        best_box,best_order,used_volume, utilization = history[0]
-        if used_volume:
-            print("=="*50)
-            print(f"最佳容器: {best_box.id},容器体积: {best_box.volume:.1f}cm^3,使用的体积: {used_volume:.1f}cm^3, 利用率: {utilization:.1f}%")
-            print("物品放置顺序:")
-            for i in best_order:
-                print(f"尺寸: {i.get_current_size()} 位置: {i.position}")
+            if max_boxes is not None and len(bins) >= max_boxes:
+                leftovers.append(item)
+                continue
+            opening = fitting[-1]
+            box = Box(opening.id, *opening.dims, opening.is_used_for_frozen)
+            layout_items([item], box, bounds=bounds)
+            bins.append((box, [item]))
+
+    results = []
+    for opening, packed in bins:
+        # 从小到大尝试能装下该箱物品的容器；开箱时的容器按相同的顺序和碎片下限重新布局，与分配时的结果相同，一定能成功
+        for candidate in screen_boxes((i.dims for i in packed), boxes) + [opening]:
+            box = Box(candidate.id, *candidate.dims, candidate.is_used_for_frozen)
+            if layout_items(packed, box, bounds=bounds):
+                break
+        used_volume = sum(i.volume for i in packed)
+        results.append((box, packed, used_volume, used_volume / box.volume * 100))
+    return results, leftovers
+
+
+def pack_order(items, boxes, restarts=10, master_seed=0, stats=None):
+    """
+    对单个订单在当前进程内多次退火，返回利用率最高的结果 (容器, 放置顺序, 使用体积, 利用率)
+    stats: PackStats，累计全部重启的统计
+    """
+    items, boxes = preprocess_order(items, boxes)
+    pack_fn = partial(simulated_annealing_pack, stats=stats) if stats else simulated_annealing_pack
+    return parallel_pack({0: (items, boxes)}, pack_fn, restarts, 1, master_seed)[0]
+
+
+def pack_orders(orders, boxes, restarts=10, workers=None, master_seed=0, cache=None, split_budget=5.0, executor=None):
+    """
+    对一组订单 {订单序号: 物品列表} 并行退火，依次产出 (订单序号, 各箱结果列表)，各箱结果为 (容器, 放置顺序, 使用体积, 利用率)
+    单个容器能装下的订单只有一箱；装不下的订单用 split_order 在 split_budget 秒内拆成多箱，
+    仍有物品放不进任何容器时，最后附加一项 (None, 未装箱物品, 0, 0)；没有可识别商品的订单产出空列表
+    boxes: BoxPools 或容器列表；executor: 复用的进程池，见 parallel_pack；cache: PackCache 装箱结果缓存，商品组合相同的订单只退火一次；为 None 时只在这组订单内复用结果
+    """
+    pools = boxes if isinstance(boxes, BoxPools) else BoxPools(boxes)
+    prepared = {order_id: preprocess_order(items, pools) for order_id, items in orders.items() if items}
+    if cache is None:
+        cache = PackCache()
+
+    # 查询缓存，未命中的商品组合各选一个订单作为代表进行退火
+    signatures = {order_id: order_signature(*prepared[order_id]) for order_id in prepared}
+    entries, representatives = {}, {}
+    for order_id, signature in signatures.items():
+        if signature in entries or signature in representatives:
+            continue
+        entry = cache.get(signature)
+        if entry is None:
+            representatives[signature] = order_id
         else:
-            print("无可行解")
+            entries[signature] = entry
+    results = parallel_pack({order_id: prepared[order_id] for order_id in representatives.values()},
+                            simulated_annealing_pack, restarts, workers, master_seed, executor)
+    for signature, order_id in representatives.items():
+        entries[signature] = encode_result(results[order_id])
+        cache.put(signature, entries[signature])
+
+    for order_id, items in orders.items():
+        if order_id not in prepared:
+            yield order_id, []  # 订单中没有可识别的商品
+            continue
+        items, order_boxes = prepared[order_id]
+        result = decode_result(entries[signatures[order_id]], items, order_boxes)
+        if result[0]:
+            yield order_id, [result]
+            continue
+        # 单个容器装不下，拆分到多个容器（拆分后的单箱可以使用体积更小的容器）
+        bins, leftovers = split_order(items, pools.select(items[0].is_frozen),
+                                      deadline=time.perf_counter() + split_budget)
+        if leftovers:
+            bins.append((None, leftovers, 0, 0))
+        yield order_id, bins
+
+
+def run_batch(order_path, sku_table, boxes, restarts=10, output='装箱结果.csv', workers=None, master_seed=0,
+              cache=None, chunk_size=256, catalogue=None, split_budget=5.0):
+    """
+    流式批量处理订单文件中的全部订单：每读入 chunk_size 个订单并行装箱一次，结果逐行写入 csv 结果表
+    拆分到多个容器的订单每箱写一行，放不进任何容器的物品另写一行（包装箱为空，只记录物品尺寸）；同一订单序号的记录不相邻时（见 iter_orders）各段作为不同订单分别装箱，
+    以相同的订单序号各自写出结果并计入订单数；catalogue: SkuCatalogue，给定时物品直接引用目录中预先生成的方向表
+    返回 (订单数, 平均利用率)，拆分订单的利用率按全部箱子的总体积计算
+    """
+    orders = iter_orders(order_path, sku_table, Item, catalogue)
+    pools = boxes if isinstance(boxes, BoxPools) else BoxPools(boxes)
+    count, total_utilization = 0, 0
+    f = open(output, 'w', encoding='utf-8-sig', newline='') if output else None
+    try:
+        writer = csv.writer(f) if f else None
+        if writer:
+            writer.writerow(['订单序号', '包装箱', '利用率', '物品放置'])
+        while True:
+            chunk = list(itertools.islice(orders, chunk_size))
+            if not chunk:
+                break
+            # 订单序号在本批中重复时改用 (订单序号, 批内序号) 作为键，避免后一个订单覆盖前一个
+            keys, seen = [], set()
+            for k, (order_id, _) in enumerate(chunk):
+                keys.append((order_id, k) if order_id in seen else order_id)
+                seen.add(order_id)
+            ids = dict(zip(keys, (order_id for order_id, _ in chunk)))
+            batch = {key: items for key, (_, items) in zip(keys, chunk)}
+            for key, bins in pack_orders(batch, pools, restarts, workers, master_seed, cache, split_budget):
+                order_id = ids[key]
+                count += 1
+                rows = []
+                for best_box, best_order, used_volume, utilization in bins:
+                    if best_box:
+                        placements = [{'size': i.get_current_size(), 'position': i.position} for i in best_order]
+                        rows.append([order_id, best_box.id, round(utilization, 2), str(placements)])
+                        print(f"订单{order_id}: 物品数量 {len(best_order)}, 最佳容器 {best_box.id}, 利用率 {utilization:.1f}%")
+                    else:
+                        # 未装箱物品单独写一行：包装箱为空，物品放置中只有尺寸、位置为 None
+                        placements = [{'size': i.dims, 'position': None} for i in best_order]
+                        rows.append([order_id, '', 0, str(placements)])
+                        print(f"订单{order_id}: {len(best_order)} 件物品放不进任何容器")
+                packed = [b for b in bins if b[0]]
+                if packed:
+                    total_utilization += sum(b[2] for b in packed) / sum(b[0].volume for b in packed) * 100
+                    if len(packed) > 1:
+                        print(f"订单{order_id}: 拆分为 {len(packed)} 箱")
+                else:
+                    rows = rows or [[order_id, '', 0, '']]
+                    print(f"订单{order_id}: 无可行解")
+                if writer:
+                    writer.writerows(rows)
+    finally:
+        if f:
+            f.close()
+    return count, total_utilization / count if count else 0
+
+
+if __name__=='__main__':
+    boxes = BoxPools(load_boxes('box_inf.txt'))  # 容器池只构建一次，全部订单共享
+    sku_table = load_sku_table('附件2-商品尺寸.xlsx')
+    cache = PackCache('pack_cache.sqlite')
+    count, mean_utilization = run_batch('附件3-订单信息.xlsx', sku_table, boxes, cache=cache,
+                                        catalogue=SkuCatalogue(sku_table))
+    cache.close()
+    print("=="*50)
+    print(f"共处理订单 {count} 个，平均利用率: {mean_utilization:.1f}%")
@@ -0,0 +1,47 @@
+"""
+商品目录预处理
+核心功能：商品尺寸表是固定的，一次性为全部商品生成 NumPy 表：原始尺寸、排序后的尺寸、体积、冷冻标志，
+以及去重后按底面积降序、高度升序排好的摆放方向；订单中的物品按商品编号引用这些表，
+布局时直接使用预先排好的方向，不必在循环中重新生成排列
+"""
+import itertools
+
+import numpy as np
+
+PERMUTATIONS = np.array(list(itertools.permutations(range(3))))  # 6 种轴排列，顺序与 itertools.permutations 一致
+
+
+def orientation_tables(dims):
+    """
+    为 n 件商品的尺寸 (n, 3) 生成摆放方向表，返回 (方向 (n, 6, 3), 各商品不重复的方向数 (n,))
+    每行按底面积降序、高度升序稳定排序后去掉重复方向，有效方向排在前面，其余位置为重复方向
+    """
+    dims = np.asarray(dims, dtype=float).reshape(-1, 3)
+    perms = dims[:, PERMUTATIONS]
+    order = np.lexsort((perms[:, :, 2], -perms[:, :, 0] * perms[:, :, 1]), axis=-1)
+    perms = np.take_along_axis(perms, order[:, :, None], axis=1)
+    # 与排在前面的某个方向完全相同的方向视为重复
+    same = (perms[:, :, None, :] == perms[:, None, :, :]).all(axis=3)
+    duplicate = np.tril(same, k=-1).any(axis=2)
+    keep_first = np.argsort(duplicate, axis=1, kind='stable')
+    perms = np.take_along_axis(perms, keep_first[:, :, None], axis=1)
+    return perms, (~duplicate).sum(axis=1)
+
+
+class SkuCatalogue:
+    """商品目录表，第 k 行对应 codes[k]"""
+    def __init__(self, sku_table):
+        """sku_table: {Item_Code: (长, 宽, 高, 是否冷冻)}，即 order_stream.load_sku_table 的返回值"""
+        self.codes = list(sku_table)
+        self.index = {code: k for k, code in enumerate(self.codes)}  # 商品编号 -> 行号
+        self.dims = np.array([sku_table[code][:3] for code in self.codes], dtype=float).reshape(-1, 3)
+        self.frozen = np.array([bool(sku_table[code][3]) for code in self.codes], dtype=bool)
+        self.sorted_dims = np.sort(self.dims, axis=1)
+        self.volumes = self.dims[:, 0] * self.dims[:, 1] * self.dims[:, 2]
+        self.orientations, self.orientation_counts = orientation_tables(self.dims)
+        # 转换为元组，逐件放置时直接引用，不再经过 NumPy
+        self.orientation_tuples = [tuple(map(tuple, rows[:count].tolist()))
+                                   for rows, count in zip(self.orientations, self.orientation_counts)]
+
+    def __len__(self):
+        return len(self.codes)
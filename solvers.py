@@ -0,0 +1,228 @@
+"""
+装箱算法注册表与统一命令行入口
+核心功能：把四个装箱脚本中的算法登记为统一接口的求解器（greedy-ep 极点法贪心、greedy-bestfit 最优匹配贪心、
+sa 模拟退火，以及限时组合求解 portfolio），求解器接收与脚本无关的物品和容器描述，返回相同格式的装箱结果，
+便于按订单规模选择求解器，或在同一批订单上比较各算法的速度和利用率
+
+用法：python solvers.py --solver all --restarts 3
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import math
+import os
+import random
+import time
+
+from box_catalogue import load_catalogue
+from box_screen import screen_boxes
+from order_stream import iter_orders, load_sku_table
+from pack_stats import PackStats
+from parallel_pack import derive_seed
+
+SOLVERS = {}  # 求解器名称 -> 求解函数
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SCRIPTS = {}
+
+
+def load_script(filename):
+    """按文件名导入装箱脚本（脚本文件名含括号和中文，不能直接 import），同一脚本只导入一次"""
+    if filename not in _SCRIPTS:
+        name = 'solver_' + str(len(_SCRIPTS))
+        spec = importlib.util.spec_from_file_location(name, os.path.join(_HERE, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _SCRIPTS[filename] = module
+    return _SCRIPTS[filename]
+
+
+def register(name):
+    """登记求解器的装饰器，求解函数签名为 solver(items, boxes, stats=None, **options)，stats 为 PackStats"""
+    def decorator(fn):
+        SOLVERS[name] = fn
+        return fn
+    return decorator
+
+
+def read_boxes(path='box_inf.txt'):
+    """读取包装箱信息文件，返回容器描述列表 [(编号, 长, 宽, 高, 是否冷冻专用), ...]"""
+    return load_catalogue(path).specs()
+
+
+def make_result(box_id, placements, box_volume):
+    """
+    统一的装箱结果，与 pack_cache 中缓存条目的格式相同
+    placements: [(物品原始尺寸, 位置, 放置尺寸), ...]；box_id 为 None 表示没有可行解
+    """
+    if box_id is None:
+        return {'box': None, 'placements': [], 'used_volume': 0, 'utilization': 0}
+    used_volume = sum(d[0] * d[1] * d[2] for d, _, _ in placements)
+    return {
+        'box': box_id,
+        'placements': [[sorted(d), list(pos), list(orientation)] for d, pos, orientation in placements],
+        'used_volume': used_volume,
+        'utilization': used_volume / box_volume * 100,
+    }
+
+
+def _greedy(filename, items, boxes, stats=None):
+    """两个贪心脚本的公共适配：构造脚本自己的 Item / Box 后调用 greedy_pack"""
+    script = load_script(filename)
+    script_items = [script.Item(l, w, h, is_frozen) for l, w, h, is_frozen in items]
+    script_boxes = [script.Box(box_id, l, w, h, is_frozen, [(0, 0, 0)]) for box_id, l, w, h, is_frozen in boxes]
+    box = script.greedy_pack(script_items, script_boxes, stats=stats)[0]
+    if not box:
+        return make_result(None, [], 0)
+    placements = [((i.l, i.w, i.h), i.positions, i.orientations) for i in box.placed_items]
+    return make_result(box.id, placements, box.volume)
+
+
+@register('greedy-ep')
+def greedy_extreme_point(items, boxes, stats=None):
+    """极点法贪心（question1___(1).py）"""
+    return _greedy('question1___(1).py', items, boxes, stats)
+
+
+@register('greedy-bestfit')
+def greedy_best_fit(items, boxes, stats=None):
+    """最优匹配贪心（question1____(2).py）"""
+    return _greedy('question1____(2).py', items, boxes, stats)
+
+
+@register('sa')
+def simulated_annealing(items, boxes, restarts=10, master_seed=0, stats=None):
+    """模拟退火（question_2.py），restarts 次独立退火取利用率最高的结果"""
+    import question_2
+    script_items = [question_2.Item(l, w, h, is_frozen) for l, w, h, is_frozen in items]
+    script_boxes = [question_2.Box(box_id, l, w, h, is_frozen) for box_id, l, w, h, is_frozen in boxes]
+    box, order, _, _ = question_2.pack_order(script_items, script_boxes, restarts, master_seed, stats)
+    if not box:
+        return make_result(None, [], 0)
+    return make_result(box.id, [(i.dims, i.position, i.orientation) for i in order], box.volume)
+
+
+def _order_like(items, placements):
+    """按结果中的放置顺序排列物品（按尺寸对应），用作退火的初始顺序"""
+    pool = {}
+    for item in items:
+        pool.setdefault(tuple(sorted(item.dims)), []).append(item)
+    return [pool[tuple(dims)].pop() for dims, _, _ in placements]
+
+
+@register('portfolio')
+def portfolio(items, boxes, budget=1.0, master_seed=0, stats=None):
+    """
+    限时组合求解：先运行两个贪心算法，已经用上可行的最小容器（装箱下界）时立即返回；
+    否则把剩余时间交给模拟退火，以贪心的最好结果为初始顺序反复退火，随时保留目前最好的结果
+    budget: 每个订单的时间预算（秒），退火在截止时刻返回已找到的最好结果
+    """
+    import question_2
+    start = time.perf_counter()
+    deadline = start + budget
+    best = make_result(None, [], 0)
+    for name in ('greedy-ep', 'greedy-bestfit'):
+        result = SOLVERS[name](items, boxes, stats=stats)
+        if result['utilization'] > best['utilization']:
+            best = result
+    if stats:
+        stats.add_time('greedy', time.perf_counter() - start)
+
+    script_items = [question_2.Item(l, w, h, is_frozen) for l, w, h, is_frozen in items]
+    script_boxes = [question_2.Box(box_id, l, w, h, is_frozen) for box_id, l, w, h, is_frozen in boxes]
+    script_items, script_boxes = question_2.preprocess_order(script_items, script_boxes)
+    feasible = screen_boxes((i.dims for i in script_items), script_boxes)
+    if not feasible or best['box'] == feasible[0].id:
+        return best  # 没有可行容器，或贪心结果已达到容器下界
+
+    initial_order = _order_like(script_items, best['placements']) if best['box'] else None
+    restart = 0
+    while time.perf_counter() < deadline:
+        box, order, _, utilization = question_2.simulated_annealing_pack(
+            script_items, script_boxes, initial_order=initial_order, deadline=deadline,
+            rng=random.Random(derive_seed(master_seed, 0, restart)), stats=stats)
+        # 最终布局失败时 used_space 为空，不能作为结果
+        if box and box.used_space and utilization > best['utilization']:
+            best = make_result(box.id, [(i.dims, i.position, i.orientation) for i in order], box.volume)
+            if box.id == feasible[0].id:
+                break
+        restart += 1
+    if stats:
+        stats.count('annealing_restarts', restart)
+    return best
+
+
+def solve(name, items, boxes, **options):
+    """
+    用指定求解器装箱，返回 (装箱结果, 耗时秒数)
+    items: [(长, 宽, 高, 是否冷冻), ...]；boxes: [(编号, 长, 宽, 高, 是否冷冻专用), ...]
+    """
+    if name not in SOLVERS:
+        raise KeyError(f"未知的求解器 {name}，可选：{', '.join(SOLVERS)}")
+    start = time.perf_counter()
+    result = SOLVERS[name](list(items), boxes, **options) if items else make_result(None, [], 0)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='三维装箱求解器统一入口')
+    parser.add_argument('--solver', default='sa', choices=sorted(SOLVERS) + ['all'],
+                        help='求解器名称，all 表示在同一批订单上依次运行全部求解器')
+    parser.add_argument('--orders', default='附件3-订单信息.xlsx', help='订单文件（xlsx / csv）')
+    parser.add_argument('--skus', default='附件2-商品尺寸.xlsx', help='商品尺寸文件（xlsx / csv）')
+    parser.add_argument('--boxes', default='box_inf.txt', help='包装箱信息文件')
+    parser.add_argument('--restarts', type=int, default=10, help='模拟退火的重启次数')
+    parser.add_argument('--seed', type=int, default=0, help='模拟退火的主随机种子')
+    parser.add_argument('--budget', type=float, default=1.0, help='portfolio 求解器每个订单的时间预算（秒）')
+    parser.add_argument('--output', help='结果 csv 文件，不指定时只打印汇总')
+    parser.add_argument('--stats-output', help='逐订单统计 JSON Lines 文件（计数器、计时器和退火轨迹），不指定时不收集统计')
+    args = parser.parse_args(argv)
+
+    names = sorted(SOLVERS) if args.solver == 'all' else [args.solver]
+    boxes = read_boxes(args.boxes)
+    sku_table = load_sku_table(args.skus)
+    options = {
+        'sa': {'restarts': args.restarts, 'master_seed': args.seed},
+        'portfolio': {'budget': args.budget, 'master_seed': args.seed},
+    }
+    summary = {name: [0, 0, 0.0, []] for name in names}  # 订单数, 有解订单数, 利用率之和, 各订单耗时
+
+    f = open(args.output, 'w', encoding='utf-8-sig', newline='') if args.output else None
+    stats_file = open(args.stats_output, 'w', encoding='utf-8') if args.stats_output else None
+    try:
+        writer = csv.writer(f) if f else None
+        if writer:
+            writer.writerow(['订单序号', '求解器', '包装箱', '利用率', '耗时', '物品放置'])
+        for order_id, items in iter_orders(args.orders, sku_table, lambda l, w, h, is_frozen: (l, w, h, is_frozen)):
+            for name in names:
+                stats = PackStats() if stats_file else None
+                result, elapsed = solve(name, items, boxes, stats=stats, **options.get(name, {}))
+                if stats_file:
+                    record = {'order': order_id, 'solver': name, 'box': result['box'], 'seconds': elapsed}
+                    record.update(stats.to_dict())
+                    stats_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                stats = summary[name]
+                stats[0] += 1
+                stats[1] += result['box'] is not None
+                stats[2] += result['utilization']
+                stats[3].append(elapsed)
+                print(f"订单{order_id} [{name}]: 容器 {result['box']}, 利用率 {result['utilization']:.1f}%, 耗时 {elapsed:.3f}s")
+                if writer:
+                    writer.writerow([order_id, name, result['box'] or '', round(result['utilization'], 2),
+                                     round(elapsed, 4), str(result['placements'])])
+    finally:
+        if f:
+            f.close()
+        if stats_file:
+            stats_file.close()
+
+    print("=="*50)
+    for name, (count, solved, total_utilization, times) in summary.items():
+        mean = total_utilization / count if count else 0
+        p99 = sorted(times)[math.ceil(len(times) * 0.99) - 1] if times else 0
+        print(f"{name:>15}: 订单 {count} 个, 有解 {solved} 个, 平均利用率 {mean:.1f}%, "
+              f"总耗时 {sum(times):.2f}s, P99 耗时 {p99:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+已放置物品的空间索引
+核心功能：把已放置物品登记到三维均匀网格中，碰撞检查只比较与候选位置落在相同网格单元内的物品，
+避免每次都遍历容器中的全部物品
+"""
+
+
+def _overlap(pos1, dims1, pos2, dims2):
+    """判断两个长方体是否重叠（与装箱脚本中的 check_overlap 判定一致，仅接触不算重叠）"""
+    x1, y1, z1 = pos1
+    w1, h1, d1 = dims1
+    x2, y2, z2 = pos2
+    w2, h2, d2 = dims2
+    x_overlap = x2 < x1 + w1 if x1 <= x2 else x1 < x2 + w2
+    y_overlap = y2 < y1 + h1 if y1 <= y2 else y1 < y2 + h2
+    z_overlap = z2 < z1 + d1 if z1 <= z2 else z1 < z2 + d2
+    return x_overlap and y_overlap and z_overlap
+
+
+def grid_cell_size(dims_list):
+    """根据物品尺寸选择网格边长：取各物品中间尺寸的平均值，使一个物品只覆盖少量单元"""
+    middles = [sorted(dims)[1] for dims in dims_list]
+    if not middles:
+        return 1.0
+    return max(sum(middles) / len(middles), 1e-6)
+
+
+class LinearIndex:
+    """线性扫描索引：逐个比较全部已放置物品，作为网格索引的对照基准"""
+    def __init__(self, cell_size=None):
+        self.entries = []
+
+    def insert(self, pos, dims):
+        """登记一个已放置物品"""
+        self.entries.append((pos, dims))
+
+    def overlaps(self, pos, dims):
+        """判断候选位置是否与任一已放置物品重叠"""
+        for p, d in self.entries:
+            if _overlap(pos, dims, p, d):
+                return True
+        return False
+
+
+class SpatialGrid:
+    """三维均匀网格索引：每个物品登记到它覆盖的所有网格单元中"""
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.entries = []  # 已放置物品 (pos, dims)
+        self.cells = {}    # 网格单元坐标 -> 覆盖该单元的物品下标列表
+
+    def _cell_ranges(self, pos, dims):
+        """物品在各坐标轴上覆盖的网格单元范围（包含终点所在单元，保证浮点尺寸下不会漏检）"""
+        c = self.cell_size
+        return [range(int(p // c), int((p + d) // c) + 1) for p, d in zip(pos, dims)]
+
+    def insert(self, pos, dims):
+        """登记一个已放置物品"""
+        index = len(self.entries)
+        self.entries.append((pos, dims))
+        xs, ys, zs = self._cell_ranges(pos, dims)
+        for ix in xs:
+            for iy in ys:
+                for iz in zs:
+                    self.cells.setdefault((ix, iy, iz), []).append(index)
+
+    def overlaps(self, pos, dims):
+        """判断候选位置是否与任一已放置物品重叠，只检查共享网格单元的物品"""
+        if not self.entries:
+            return False
+        xs, ys, zs = self._cell_ranges(pos, dims)
+        checked = set()
+        for ix in xs:
+            for iy in ys:
+                for iz in zs:
+                    for index in self.cells.get((ix, iy, iz), ()):
+                        if index in checked:
+                            continue
+                        checked.add(index)
+                        p, d = self.entries[index]
+                        if _overlap(pos, dims, p, d):
+                            return True
+        return False
@@ -0,0 +1,50 @@
+"""
+模拟退火批量入口 run_orders 的测试：单件、相同物品等退化订单，以及格式错误的订单
+用法：python -m pytest -q test_annealing_runner.py
+"""
+import importlib
+import io
+import json
+
+import pytest
+
+from box_catalogue import load_catalogue
+
+annealing = importlib.import_module('question1___退火')
+
+
+@pytest.fixture(scope='module')
+def boxes():
+    return [annealing.Box(*spec) for spec in load_catalogue('box_inf.txt').specs()]
+
+
+def run(orders, boxes):
+    """单进程批量退火，返回 (run_orders 的返回值, 逐行解析后的结果记录)"""
+    output = io.StringIO()
+    summary = annealing.run_orders(orders, boxes, restarts=2, workers=1, output=output)
+    return summary, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_degenerate_orders_are_solved(boxes):
+    """单件订单、合并后只剩一个物品块的相同物品订单（常温 / 冷冻）都应输出一行有解的结果"""
+    orders = [
+        ('single', [(10, 8, 5, False)]),
+        ('identical', [(10, 8, 5, False)] * 4),
+        ('frozen-single', [(10, 8, 5, True)]),
+        ('frozen-identical', [(10, 8, 5, True)] * 3),
+    ]
+    (count, errors, solved, _), records = run(orders, boxes)
+    assert [r['id'] for r in records] == [order_id for order_id, _ in orders]
+    assert (count, errors, solved) == (len(orders), 0, len(orders))
+    assert all(r['box'] is not None for r in records)
+
+
+def test_error_records_are_counted_separately(boxes):
+    """格式错误的订单写为错误记录并计入错误数，不计入利用率之和"""
+    lines = ['{"id": "ok", "items": [[10, 8, 5, false]]}', '{"id": "bad", "items": [[10, 8, -5, false]]}', 'not json']
+    orders = annealing.read_order_specs(lines, {})
+    (count, errors, solved, total_utilization), records = run(orders, boxes)
+    assert (count, errors, solved) == (3, 2, 1)
+    assert [r['id'] for r in records] == ['ok', 'bad', 3]
+    assert 'error' in records[1] and 'error' in records[2]
+    assert total_utilization == records[0]['utilization']